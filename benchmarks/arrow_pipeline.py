@@ -0,0 +1,163 @@
+"""Benchmark of the pandas and Arrow result pipelines.
+
+The results of the queries of a translation are simulated with synthetic
+pages in the format of WikiData SPARQL, as the bytes received from the
+endpoint. Each pipeline decodes the pages (json then pandas, or the JSON
+reader of Arrow), merges the languages and runs translations_only, in a
+new interpreter so its peak memory is not shared with the other pipeline.
+Each pipeline is run once on a single page first, so the libraries it loads
+on first use are not counted.
+
+For each pipeline:
+- time: the duration of the pipeline.
+- peak: the increase of the peak resident memory (ru_maxrss) during the run.
+- arrow: the peak of the memory allocated by Arrow (pandas keeps its
+  strings in Arrow arrays too) and pa.total_allocated_bytes() at the end,
+  when only the result is left.
+- python: the peak of the memory of the Python objects, measured with
+  tracemalloc on a second run.
+- copies: (arrow peak + python peak) / size of the pages, the number of
+  copies of the results held at the peak.
+- result: the size of the resulting DataFrame.
+
+Usage: python benchmarks/arrow_pipeline.py [--entities N] [--pages N]
+    [--repeat N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+PIPELINE = '''
+import json
+import resource
+import sys
+import time
+import tracemalloc
+import pandas, pyarrow
+from wikidata_property_extraction import arrow_translation, header, \\
+    postprocess, translation
+header.initialize_user_agent('benchmark')
+nb_entities, nb_pages = {nb_entities}, {nb_pages}
+languages = ['fr', 'en', 'es']
+page_size = nb_entities // nb_pages
+pool = pyarrow.default_memory_pool()
+
+
+def page(language, start):
+    language_cap = language.capitalize()
+    return json.dumps({{
+        'head': {{'vars': ['entity', 'value_property',
+                          'label' + language_cap, 'alt' + language_cap]}},
+        'results': {{'bindings': [
+            {{'entity': {{'type': 'uri',
+                         'value': 'http://www.wikidata.org/entity/Q%d'
+                         % index}},
+             'value_property': {{'type': 'literal', 'value': '%07d' % index}},
+             'label' + language_cap: {{'type': 'literal',
+                                      'value': 'label %s %d'
+                                      % (language, index)}},
+             'alt' + language_cap: {{'type': 'literal',
+                                    'value': 'alt %d|other %d'
+                                    % (index, index % 97)}}}}
+            for index in range(start, start + page_size)]}}}}, indent=2
+    ).encode('utf-8')
+
+
+def make_pages(nb_entities):
+    return [(language, page(language, start),
+             start + page_size >= nb_entities)
+            for language in languages
+            for start in range(0, nb_entities, page_size)]
+
+
+def run(pages):
+    if '{pipeline}' == 'pandas':
+        translator = translation.Translator('P1', languages)
+        results_df = translator._merge_results(
+            (translator._parse_page(json.loads(content), language),
+             flag_lang)
+            for language, content, flag_lang in pages)
+        postprocess.translations_only(results_df)
+    else:
+        translator = arrow_translation.ArrowTranslator('P1', languages)
+        results_table = translator._merge_results(
+            (translator._parse_page(content, language), flag_lang)
+            for language, content, flag_lang in pages)
+        results_df = arrow_translation.to_pandas(results_table)
+        arrow_translation.translations_only(results_table)
+    return results_df
+
+
+# The libraries loaded on first use are not counted
+run(make_pages(page_size))
+pages = make_pages(nb_entities)
+pages_size = sum(len(content) for _, content, _ in pages)
+peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+arrow_before = pyarrow.total_allocated_bytes()
+start_time = time.perf_counter()
+results_df = run(pages)
+duration = time.perf_counter() - start_time
+peak_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+arrow_peak = pool.max_memory() - arrow_before
+arrow_end = pyarrow.total_allocated_bytes() - arrow_before
+result_size = results_df.memory_usage(deep=True).sum()
+del results_df
+tracemalloc.start()
+run(pages)
+python_peak = tracemalloc.get_traced_memory()[1]
+print(duration, (peak_after - peak_before) * 1024, arrow_peak, arrow_end,
+      python_peak, (arrow_peak + python_peak) / pages_size, result_size)
+'''
+
+
+def run_pipeline(pipeline, nb_entities, nb_pages):
+    """Run a pipeline in a new interpreter.
+
+    Args:
+        pipeline (string): 'pandas' or 'arrow'.
+        nb_entities (int): the number of entities per language.
+        nb_pages (int): the number of pages per language.
+
+    Returns:
+        list of float: the duration in seconds, the increase of the peak
+            memory, the peak and the end of the memory allocated by Arrow,
+            the peak of the memory of the Python objects (in bytes), the
+            number of copies of the pages at the peak and the size of the
+            resulting DataFrame in bytes.
+
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', PIPELINE.format(
+            pipeline=pipeline, nb_entities=nb_entities, nb_pages=nb_pages
+        )],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.split()
+    return [float(value) for value in output]
+
+
+def main():
+    """Run the benchmark and print the medians of the measures."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--entities', type=int, default=200000)
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    columns = ['time (s)', 'peak (MB)', 'arrow (MB)', 'arrow end',
+               'python (MB)', 'copies', 'result (MB)']
+    print('{:<8}'.format('pipeline')
+          + ''.join(' {:>11}'.format(column) for column in columns))
+    for pipeline in ['pandas', 'arrow']:
+        results = [run_pipeline(pipeline, args.entities, args.pages)
+                   for _ in range(args.repeat)]
+        medians = [statistics.median(result[index] for result in results)
+                   for index in range(len(columns))]
+        print('{:<8}'.format(pipeline) + ''.join(
+            ' {:>11.2f}'.format(value if index in (0, 5) else value / 2 ** 20)
+            for index, value in enumerate(medians)
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark of the import time of the package.
+
+Each import is timed in a new interpreter, to measure a cold start. The
+heavy dependencies are imported lazily, so importing the modules of the
+package costs much less than importing pandas, requests and tqdm.
+
+Usage: python benchmarks/import_time.py [--repeat N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+TIMED_IMPORT = '''
+import sys
+import time
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+heavy = [name for name in ['pandas', 'requests', 'tqdm']
+         if name in sys.modules]
+print(duration, ','.join(heavy))
+'''
+
+STATEMENTS = [
+    ('heavy dependencies', 'import pandas, requests, tqdm'),
+    ('translation', 'import wikidata_property_extraction.translation'),
+    ('second_order', 'import wikidata_property_extraction.second_order'),
+    ('postprocess', 'import wikidata_property_extraction.postprocess'),
+    ('query building', '''
+from wikidata_property_extraction import header, translation
+header.initialize_user_agent('benchmark')
+translation.Translator('P699', ['fr'])._format_query('fr')
+'''),
+]
+
+
+def time_import(statement):
+    """Time a statement in a new interpreter.
+
+    Args:
+        statement (string): the import statement.
+
+    Returns:
+        (float, string): the duration in seconds and the heavy dependencies
+            imported by the statement.
+
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', TIMED_IMPORT.format(statement=statement)],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.split()
+    return float(output[0]), output[1] if len(output) > 1 else ''
+
+
+def main():
+    """Run the benchmark and print the median durations."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:<20} {:>10}  {}'.format('import', 'time (ms)', 'heavy modules'))
+    for name, statement in STATEMENTS:
+        results = [time_import(statement) for _ in range(args.repeat)]
+        duration = statistics.median(result[0] for result in results)
+        print('{:<20} {:>10.1f}  {}'.format(name, duration * 1000,
+                                            results[0][1] or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark of the multi-process aggregation of translations_only.
+
+The aggregation of translations_only is run on synthetic results of
+increasing size, in the current process and in several processes. The
+partitions are pickled to the worker processes and the aggregated
+partitions pickled back, so the processes only pay off on results big
+enough; the ratio of the durations shows from which number of rows (the
+crossover) they do. With fewer CPUs
+than processes, the speedup is projected from the overhead of the
+processes (pickling, starting the processes, concatenating), as if each
+process had its own CPU.
+postprocess.MIN_ROWS_PARALLEL is the number of rows below which
+translations_only does not start any process.
+
+Usage: python benchmarks/translations_only_processes.py [--rows N [N ...]]
+    [--processes N [N ...]] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import pandas as pd
+
+from wikidata_property_extraction import postprocess
+
+LANGUAGES = ['Fr', 'En', 'Es']
+
+
+def make_results(nb_rows):
+    """Build synthetic results of Translator.translate.
+
+    Args:
+        nb_rows (int): the number of rows, about 3 rows per value_property.
+
+    Returns:
+        pd.DataFrame: the results.
+
+    """
+    columns = {
+        'entity': ['Q%d' % index for index in range(nb_rows)],
+        'value_property': ['%07d' % (index // 3) for index in range(nb_rows)],
+    }
+    for language in LANGUAGES:
+        columns['label' + language] = ['label %s %d' % (language, index)
+                                       for index in range(nb_rows)]
+        columns['alt' + language] = ['alt %d|other %d' % (index, index % 97)
+                                     for index in range(nb_rows)]
+    return pd.DataFrame(columns)
+
+
+def time_aggregation(results_df, nb_processes, repeat):
+    """Return the median duration of the aggregation of translations_only.
+
+    Args:
+        results_df (pd.DataFrame): the results, with only the column
+            value_property and the columns of the labels.
+        nb_processes (int): the number of processes, 1 for the aggregation
+            in the current process.
+        repeat (int): the number of runs.
+
+    Returns:
+        float: the median duration in seconds.
+
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if nb_processes == 1:
+            postprocess._aggregate_translations(results_df)
+        else:
+            postprocess._aggregate_in_processes(results_df, nb_processes)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    """Run the benchmark and print the durations and the speedups."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[10000, 100000, 300000])
+    parser.add_argument('--processes', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    nb_cpus = os.cpu_count() or 1
+    print('{} CPUs, MIN_ROWS_PARALLEL = {}'.format(
+        nb_cpus, postprocess.MIN_ROWS_PARALLEL
+    ))
+    print('{:>8} {:>9} {:>10} {:>9} {:>9} {:>9}'.format(
+        'rows', 'processes', 'serial (s)', 'procs (s)', 'overhead',
+        'speedup'
+    ))
+    for nb_rows in args.rows:
+        results_df = make_results(nb_rows).drop(columns='entity')
+        serial = time_aggregation(results_df, 1, args.repeat)
+        for nb_processes in args.processes:
+            parallel = time_aggregation(results_df, nb_processes,
+                                        args.repeat)
+            if nb_cpus >= nb_processes:
+                overhead = parallel - serial / nb_processes
+                speedup = '{:.2f}'.format(serial / parallel)
+            else:
+                # The processes share the CPUs, their aggregations add up to
+                # about the serial duration
+                overhead = parallel - serial
+                speedup = '{:.2f}*'.format(
+                    serial / (serial / nb_processes + max(overhead, 0.))
+                )
+            print('{:>8} {:>9} {:>10.2f} {:>9.2f} {:>8.2f}s {:>9}'.format(
+                nb_rows, nb_processes, serial, parallel, overhead, speedup
+            ))
+    if nb_cpus < max(args.processes):
+        print('* projected from the overhead measured, fewer CPUs than '
+              + 'processes')
+
+
+if __name__ == '__main__':
+    main()
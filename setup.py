@@ -26,6 +26,13 @@ setup(
     author="Léo Bouscarrat, EURA NOVA",
     author_email="leo.bouscarrat@euranova.eu, research@euranova.eu",
     install_requires=["pandas", "requests", "tqdm"],
+    extras_require={"async": ["aiohttp"], "parquet": ["pyarrow"],
+                    "arrow": ["pyarrow"]},
+    entry_points={
+        "console_scripts": [
+            "wikidata-extract=wikidata_property_extraction.cli:main",
+        ],
+    },
     url='https://github.com/euranova/wikidata_property_extraction',
     project_urls={'Paper': 'https://hal.archives-ouvertes.fr/hal-02531140v1'},
     python_requires='>=3',
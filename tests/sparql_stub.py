@@ -0,0 +1,211 @@
+"""Local stand-in of a Wikidata SPARQL endpoint for the tests.
+
+The stand-in only understands the queries built by this package: it parses
+the property, the language, the VALUES and the LIMIT/OFFSET of the query and
+answers from a small in-memory dataset.
+"""
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENTITY_PREFIX = 'http://www.wikidata.org/entity/'
+
+# property -> list of (entity, value_property)
+STATEMENTS = {
+    'P1': [('Q' + str(100 + index), str(index).zfill(3))
+           for index in range(23)] + [('Q500', '001')],
+    'P2': [('Q' + str(200 + index), 'M' + str(index))
+           for index in range(7)],
+}
+
+# entity -> language -> (label, list of alt labels)
+LABELS = {}
+for index in range(23):
+    LABELS['Q' + str(100 + index)] = {
+        'fr': ('maladie ' + str(index), ['mal ' + str(index),
+                                         'syndrome ' + str(index)]),
+        'en': ('disease ' + str(index), ['dis ' + str(index)]),
+    }
+# Some entities without any alt label or without a label in a language
+LABELS['Q103']['en'] = ('disease 3', [])
+del LABELS['Q104']['en']
+LABELS['Q500'] = {'fr': ('Ain bis', ['ain'])}
+for index in range(7):
+    LABELS['Q' + str(200 + index)] = {
+        'fr': ('terme ' + str(index), ['synonyme ' + str(index)]),
+        'es': ('término ' + str(index), []),
+    }
+
+
+def _select_statements(query):
+    """Return the statements selected by the subquery of a query."""
+    property_wiki = re.search(r'wdt:(P[0-9]+)', query).group(1)
+    statements = sorted(STATEMENTS.get(property_wiki, []),
+                        key=lambda statement: ENTITY_PREFIX + statement[0])
+    if 'VALUES' in query:
+        values_part = query[query.index('VALUES'):]
+        values_part = values_part[:values_part.index('}')]
+        id_list = re.findall(r'\("([^"]*)"\)', values_part)
+        statements = [statement for statement in statements
+                      if statement[1] in id_list]
+    limit = re.search(r'LIMIT ([0-9]+) OFFSET ([0-9]+)', query)
+    if limit is not None:
+        offset = int(limit.group(2))
+        statements = statements[offset:offset + int(limit.group(1))]
+    return statements
+
+
+def answer(query):
+    """Answer a query with the SPARQL 1.1 JSON results format.
+
+    Args:
+        query (string): a query built by the package.
+
+    Returns:
+        dict: the SPARQL results.
+
+    """
+    if query.startswith('ASK'):
+        return {'head': {}, 'boolean': True}
+
+    if 'COUNT' in query:
+        property_wiki = re.search(r'wdt:(P[0-9]+)', query).group(1)
+        nb_elem = len({entity for entity, _
+                       in STATEMENTS.get(property_wiki, [])})
+        bindings = [{'nb_elem': {'type': 'literal', 'value': str(nb_elem)}}]
+        return {'head': {'vars': ['nb_elem']},
+                'results': {'bindings': bindings}}
+
+    if 'wikibase:label' not in query:
+        return _answer_without_service(query)
+
+    language = re.search(r"wikibase:language '([a-z-]+)'", query).group(1)
+    language_cap = language.capitalize()
+    bindings = []
+    for entity, value in _select_statements(query):
+        label, alt_list = LABELS.get(entity, {}).get(language,
+                                                     (entity, []))
+        bindings.append({
+            'entity': {'type': 'uri', 'value': ENTITY_PREFIX + entity},
+            'value_property': {'type': 'literal', 'value': value},
+            'label' + language_cap: {'type': 'literal', 'value': label},
+            'alt' + language_cap: {'type': 'literal',
+                                   'value': '|'.join(alt_list)},
+        })
+    return {'head': {'vars': ['entity', 'value_property',
+                              'label' + language_cap, 'alt' + language_cap]},
+            'results': {'bindings': bindings}}
+
+
+def _answer_without_service(query):
+    """Answer a query reading rdfs:label and skos:altLabel directly.
+
+    Each label and alternative label is in its own row, as the UNION of the
+    query gives them.
+    """
+    language = re.search(r"lang\(\?label[A-Za-z-]*\)='([a-z-]+)'",
+                         query).group(1)
+    language_cap = language.capitalize()
+    bindings = []
+    for entity, value in _select_statements(query):
+        binding = {
+            'entity': {'type': 'uri', 'value': ENTITY_PREFIX + entity},
+            'value_property': {'type': 'literal', 'value': value},
+        }
+        rows = []
+        if language in LABELS.get(entity, {}):
+            label, alt_list = LABELS[entity][language]
+            rows.append({'label' + language_cap: {
+                'type': 'literal', 'xml:lang': language, 'value': label
+            }})
+            rows += [{'alt' + language_cap: {
+                'type': 'literal', 'xml:lang': language, 'value': alt
+            }} for alt in alt_list]
+        # The OPTIONAL gives a row without label for the other entities
+        for row in rows or [{}]:
+            bindings.append(dict(binding, **row))
+    return {'head': {'vars': ['entity', 'value_property',
+                              'label' + language_cap, 'alt' + language_cap]},
+            'results': {'bindings': bindings}}
+
+
+class StubEndpoint():
+    """A stand-in SPARQL endpoint served in a background thread.
+
+    Use it as a context manager, the url of the endpoint is in `url`.
+    `status` can be changed to make the endpoint answer with an error, and
+    `nb_throttled` to answer the next requests with an error 429 and the
+    header Retry-After `retry_after`. With `hang`, the endpoint receives the
+    requests but never answers them. The User-Agent of each request is in
+    `user_agents` and the time it has been received in `times`.
+    """
+
+    def __init__(self):
+        """Init the stand-in endpoint."""
+        self.status = 200
+        self.nb_throttled = 0
+        self.retry_after = 1
+        self.hang = False
+        self._closed = threading.Event()
+        self.queries = []
+        self.user_agents = []
+        self.times = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Handler of the requests of the stand-in."""
+
+            def do_GET(self):
+                """Answer a GET request."""
+                parsed = urllib.parse.urlparse(self.path)
+                params = urllib.parse.parse_qs(parsed.query)
+                query = params.get('query', [''])[0]
+                with stub._lock:
+                    stub.queries.append(query)
+                    stub.user_agents.append(self.headers.get('User-Agent'))
+                    stub.times.append(time.monotonic())
+                    throttled = stub.nb_throttled > 0
+                    stub.nb_throttled -= throttled
+                if stub.hang:
+                    stub._closed.wait()
+                    return
+                if throttled:
+                    self.send_response(429)
+                    self.send_header('Retry-After', str(stub.retry_after))
+                    self.end_headers()
+                    return
+                if stub.status != 200:
+                    self.send_response(stub.status)
+                    self.end_headers()
+                    return
+                body = json.dumps(answer(query)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'application/sparql-results+json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                """Silence the logs of the server."""
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/sparql'.format(
+            self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+
+    def __enter__(self):
+        """Start the server."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop the server."""
+        self._closed.set()
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,113 @@
+"""Testing arrow_translation.py."""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from wikidata_property_extraction import arrow_translation, header, \
+    postprocess, second_order, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def _records(results_df):
+    """Return the rows of a DataFrame as dicts, with None for the nulls."""
+    results_df = results_df.astype(object)
+    return results_df.where(results_df.notna(), None).to_dict('records')
+
+
+def test_arrow_same_as_translator():
+    """Test if the Arrow pipeline gives the same rows as Translator."""
+    with StubEndpoint() as endpoint:
+        for id_list in [None, ['001', '003', '004', '404']]:
+            for label_service in [True, False]:
+                expected_df = translation.Translator(
+                    'P1', ['fr', 'en'], limit=5, nb_elems_values=2,
+                    url=endpoint.url
+                ).translate(id_list)
+                result_table = arrow_translation.ArrowTranslator(
+                    'P1', ['fr', 'en'], limit=5, nb_elems_values=2,
+                    url=endpoint.url, label_service=label_service
+                ).translate(id_list)
+                results_df = arrow_translation.to_pandas(result_table)
+                assert list(results_df.columns) == list(expected_df.columns)
+                assert _records(results_df) == _records(expected_df)
+
+
+def test_arrow_second_order():
+    """Test if ArrowSecondOrder gives the rows of SecondOrder."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '900', '003', '001', '002', '004'],
+        'id_auxiliary': ['M1', 'M2', 'M3', 'M1', 'M404', 'M2', '005'],
+        'name_auxiliary': ['MeSH'] * 7,
+    })
+    # Two properties of the same ontology, and duplicated links
+    dict_properties = {'P2': 'MeSH', 'P1': 'MeSH'}
+    chunks = [links_df.iloc[start:start + 3] for start in range(0, 7, 3)]
+    with StubEndpoint() as endpoint:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, dict_properties, ['fr', 'es'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        result_table = arrow_translation.ArrowSecondOrder(
+            'P1', iter(chunks), dict_properties, ['fr', 'es'],
+            all_elem=False, url=endpoint.url
+        ).translate()
+    columns = list(expected_df.columns)
+    assert result_table.column_names == columns
+    assert result_table.num_rows == len(expected_df)
+    results_df = arrow_translation.to_pandas(result_table)
+    expected_df = expected_df.fillna('').sort_values(columns)
+    results_df = results_df.astype(object).fillna('').sort_values(columns)
+    assert _records(results_df) == _records(expected_df)
+
+
+def test_arrow_translations_only():
+    """Test if the Arrow translations_only gives the output of postprocess."""
+    path_file = os.path.dirname(os.path.realpath(__file__))
+    path_json = os.path.join(path_file, 'test_translations_only_input.json')
+    with open(path_json, 'rb') as input_json:
+        translations_df = pd.read_json(input_json)
+    path_json = os.path.join(path_file, 'links_df_test.json')
+    with open(path_json, 'rb') as links_json:
+        links_df = pd.read_json(links_json)
+    links_input_df = pd.DataFrame({
+        'entity': ['Q' + str(index) for index in range(len(links_df))],
+        'value_property': links_df['value_property'],
+        'labelFr': links_df['id_auxiliary'].astype(str),
+        'altFr': links_df['name_auxiliary'] + '|Q1|'
+        + links_df['id_auxiliary'].astype(str),
+    })
+    for input_df in [translations_df, links_input_df]:
+        input_df['value_property'] = input_df['value_property'].astype(str)
+        expected_df = postprocess.translations_only(input_df) \
+            .rename_axis('value_property').reset_index()
+        result_table = arrow_translation.translations_only(
+            pa.Table.from_pandas(input_df, preserve_index=False)
+        )
+        results_df = arrow_translation.to_pandas(result_table)
+        assert list(results_df.columns) == list(expected_df.columns)
+        assert _records(results_df) == _records(expected_df)
+
+
+def test_json_to_table():
+    """Test the decoding of the bytes of results into a table."""
+    content = ('{"head": {"vars": ["entity", "label", "alt"]},\n'
+               + ' "results": {"bindings": [\n'
+               + '  {"entity": {"type": "uri", "value": "Q1"},\n'
+               + '   "label": {"type": "literal", "value": "été"}},\n'
+               + '  {"entity": {"type": "uri", "value": "Q2"}}]}}')
+    result_table = arrow_translation.json_to_table(content.encode())
+    assert result_table.to_pydict() == {'entity': ['Q1', 'Q2'],
+                                        'label': ['été', None],
+                                        'alt': [None, None]}
+    content = b'{"head": {"vars": ["entity"]}, "results": {"bindings": []}}'
+    result_table = arrow_translation.json_to_table(content)
+    assert result_table.to_pydict() == {'entity': []}
+    assert result_table.schema.field('entity').type == pa.string()
+    with pytest.raises(pa.ArrowInvalid):
+        arrow_translation.json_to_table(b'<html>Timeout</html>')
@@ -0,0 +1,166 @@
+"""Testing async_translation.py."""
+import asyncio
+import time
+
+import aiohttp
+import pandas as pd
+
+from wikidata_property_extraction import async_translation, endpoints, \
+    header, progress, second_order, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def test_async_same_as_translator():
+    """Test if AsyncTranslator gives the result of Translator."""
+    with StubEndpoint() as endpoint:
+        for id_list in [None, ['001', '005', '017', '404']]:
+            translator = translation.Translator('P1', ['fr', 'en'], limit=5,
+                                                nb_elems_values=2,
+                                                url=endpoint.url)
+            expected_df = translator.translate(id_list)
+            async_translator = async_translation.AsyncTranslator(
+                'P1', ['fr', 'en'], limit=5, nb_elems_values=2,
+                url=endpoint.url, max_concurrent_queries=3
+            )
+            result_df = asyncio.run(async_translator.translate(id_list))
+            pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_async_pages():
+    """Test the asynchronous iteration over the pages."""
+    async def count_pages(async_translator):
+        flags = []
+        async for page_df, flag_lang in async_translator.iter_pages():
+            assert len(page_df) <= 5
+            flags.append(flag_lang)
+        return flags
+
+    with StubEndpoint() as endpoint:
+        async_translator = async_translation.AsyncTranslator(
+            'P2', ['fr', 'es'], limit=5, url=endpoint.url
+        )
+        flags = asyncio.run(count_pages(async_translator))
+    assert flags == [False, True, False, True]
+
+
+def test_async_failover_timeout():
+    """Test if the queries fail over when an endpoint never answers."""
+    with StubEndpoint() as endpoint_a, StubEndpoint() as endpoint_b:
+        expected_df = translation.Translator(
+            'P2', ['fr', 'es'], limit=5, url=endpoint_b.url
+        ).translate()
+
+        endpoint_a.hang = True
+        pool = endpoints.EndpointPool([endpoint_a.url, endpoint_b.url],
+                                      timeout=0.5)
+        async_translator = async_translation.AsyncTranslator(
+            'P2', ['fr', 'es'], limit=5, url=pool
+        )
+        result_df = asyncio.run(async_translator.translate())
+        assert len(endpoint_a.queries) >= 1
+        assert not pool.is_healthy(endpoint_a.url)
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_async_second_order():
+    """Test if AsyncSecondOrder gives the result of SecondOrder."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '900', '901'],
+        'id_auxiliary': ['M1', 'M2', 'M3', 'M404'],
+        'name_auxiliary': ['MeSH'] * 4,
+    })
+    with StubEndpoint() as endpoint:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'MeSH'}, ['fr', 'es'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        result_df = asyncio.run(async_translation.AsyncSecondOrder(
+            'P1', links_df, {'P2': 'MeSH'}, ['fr', 'es'], all_elem=False,
+            url=endpoint.url
+        ).translate())
+    assert set(result_df['source_degree']) == {'First', 'Second'}
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_async_second_order_loop_not_blocked():
+    """Test if reading the links does not stall the event loop."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '900', '901'],
+        'id_auxiliary': ['M1', 'M2', 'M3', 'M404'],
+        'name_auxiliary': ['MeSH'] * 4,
+    })
+
+    def slow_chunks():
+        for start in range(0, 4, 2):
+            time.sleep(0.5)
+            yield links_df.iloc[start:start + 2]
+
+    async def translate_with_ticks(async_second_order):
+        gaps = []
+
+        async def tick():
+            last_time = time.monotonic()
+            while True:
+                await asyncio.sleep(0.02)
+                gaps.append(time.monotonic() - last_time)
+                last_time = time.monotonic()
+
+        ticker = asyncio.ensure_future(tick())
+        try:
+            result_df = await async_second_order.translate()
+        finally:
+            ticker.cancel()
+        return result_df, max(gaps)
+
+    with StubEndpoint() as endpoint:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'MeSH'}, ['fr', 'es'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        result_df, max_gap = asyncio.run(translate_with_ticks(
+            async_translation.AsyncSecondOrder(
+                'P1', slow_chunks(), {'P2': 'MeSH'}, ['fr', 'es'],
+                all_elem=False, url=endpoint.url
+            )
+        ))
+    assert max_gap < 0.4
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_async_estimate():
+    """Test if the asynchronous estimates give the synchronous ones."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '003'],
+        'id_auxiliary': ['M0', 'M1', 'M9'],
+        'name_auxiliary': ['Aux', 'Aux', 'Aux']
+    })
+
+    async def estimate_with_session(url):
+        async with aiohttp.ClientSession() as session:
+            async_translator = async_translation.AsyncTranslator(
+                'P1', ['fr', 'en'], limit=5, url=url, session=session
+            )
+            return await async_translator.estimate()
+
+    with StubEndpoint() as endpoint:
+        translator = translation.Translator('P1', ['fr', 'en'], limit=5,
+                                            url=endpoint.url)
+        assert asyncio.run(estimate_with_session(endpoint.url)) == \
+            translator.estimate()
+        expected = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], limit=10,
+            nb_elems_values=2, url=endpoint.url
+        ).estimate()
+        job_progress = progress.Progress()
+        async_second_order = async_translation.AsyncSecondOrder(
+            'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], limit=10,
+            nb_elems_values=2, url=endpoint.url, progress=job_progress
+        )
+        assert asyncio.run(async_second_order.estimate()) == expected
+        asyncio.run(async_second_order.translate())
+    assert job_progress.state()[:2] == (expected.nb_pages,
+                                        expected.nb_pages)
@@ -0,0 +1,111 @@
+"""Testing batch.py."""
+import pandas as pd
+
+from wikidata_property_extraction import batch, header, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def test_batch_same_as_translator():
+    """Test if each job of a batch gives the result of Translator."""
+    jobs = [('P1', ['fr', 'en']),
+            batch.Job('P2', ['es']),
+            batch.Job('P1', ['en'], ['001', '002', '010', '404'])]
+    with StubEndpoint() as endpoint:
+        batch_translator = batch.BatchTranslator(jobs, max_workers=3,
+                                                 limit=5, nb_elems_values=2,
+                                                 url=endpoint.url)
+        results = batch_translator.run()
+        for job, result_df in zip(batch_translator.jobs, results):
+            translator = translation.Translator(job.property_wiki,
+                                                job.languages_list, limit=5,
+                                                nb_elems_values=2,
+                                                url=endpoint.url)
+            expected_df = translator.translate(job.id_list)
+            pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_batch_shared_cache():
+    """Test if identical queries of different jobs are sent only once."""
+    jobs = [('P2', ['fr']), ('P2', ['fr', 'es'])]
+    with StubEndpoint() as endpoint:
+        batch_translator = batch.BatchTranslator(
+            jobs, max_workers=1, max_requests_per_second=100, limit=5,
+            url=endpoint.url, memory_cache=True
+        )
+        results = dict((job.languages_list[-1], result_df) for job, result_df
+                       in batch_translator.iter_results())
+        # 1 count + 2 pages in French + 2 pages in Spanish
+        assert len(endpoint.queries) == 5
+    assert set(results) == {'fr', 'es'}
+    assert len(results['es']) == 7
+
+
+def test_batch_without_label_service():
+    """Test if a batch without label service gives the same result."""
+    jobs = [('P1', ['fr', 'en'], ['001', '004', '404']), ('P2', ['es'])]
+    with StubEndpoint() as endpoint:
+        expected = batch.BatchTranslator(jobs, limit=5,
+                                         url=endpoint.url).run()
+        results = batch.BatchTranslator(jobs, limit=5, url=endpoint.url,
+                                        label_service=False).run()
+    for result_df, expected_df in zip(results, expected):
+        pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_batch_memory_cache_counts_only():
+    """Test if only the count queries are kept in memory by default."""
+    jobs = [('P2', ['fr']), ('P2', ['fr', 'es'])]
+    with StubEndpoint() as endpoint:
+        batch_translator = batch.BatchTranslator(jobs, max_workers=1,
+                                                 limit=5, url=endpoint.url)
+        batch_translator.run()
+        # 1 count + 2 pages in French twice + 2 pages in Spanish
+        assert len(endpoint.queries) == 7
+    # pylint: disable=protected-access
+    assert len(batch_translator._cache) == 1
+
+
+def test_batch_stopped():
+    """Test if the queued queries are not sent when the iteration stops."""
+    jobs = [('P1', ['fr', 'en', 'es'])] * 5
+    with StubEndpoint() as endpoint:
+        batch_translator = batch.BatchTranslator(
+            jobs, max_workers=1, max_requests_per_second=None, limit=2,
+            url=endpoint.url
+        )
+        results = batch_translator.iter_results()
+        next(results)
+        nb_queries = len(endpoint.queries)
+        results.close()
+        # At most the query running when the iteration stopped
+        assert len(endpoint.queries) <= nb_queries + 1
+        assert len(endpoint.queries) < 1 + 5 * 3 * 12
+
+
+def test_batch_error_429_pauses_all_workers():
+    """Test if the other workers wait after an error 429."""
+    jobs = [('P1', ['fr', 'en', 'es'])] * 5
+    with StubEndpoint() as endpoint:
+        expected = batch.BatchTranslator(
+            jobs[:1], max_requests_per_second=None, limit=2, url=endpoint.url
+        ).run()
+        endpoint.queries.clear()
+        endpoint.times.clear()
+        endpoint.nb_throttled = 1
+        endpoint.retry_after = 1
+        batch_translator = batch.BatchTranslator(
+            jobs, max_workers=3, max_requests_per_second=None, limit=2,
+            url=endpoint.url
+        )
+        results = batch_translator.run()
+        throttled_time = endpoint.times[0]
+        # Only the queries already sent when the error was received
+        assert not [query_time for query_time in endpoint.times
+                    if throttled_time + 0.2 < query_time
+                    < throttled_time + 0.9]
+    for result_df in results:
+        pd.testing.assert_frame_equal(result_df, expected[0])
@@ -0,0 +1,74 @@
+"""Testing cli.py."""
+import json
+
+import pandas as pd
+
+from wikidata_property_extraction import cli, header, second_order, \
+    translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+
+
+def test_cli_jobs(tmp_path):
+    """Test a job file with first and second order jobs."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '900'],
+        'id_auxiliary': ['M1', 'M2', 'M3'],
+        'name_auxiliary': ['MeSH'] * 3,
+    })
+    links_df.to_csv(tmp_path / 'links.csv', index=False)
+    (tmp_path / 'ids.txt').write_text('001\n005\n\n404\n')
+
+    with StubEndpoint() as endpoint:
+        spec = {
+            'user_agent': USER_AGENT_TEST,
+            'endpoints': [{'url': endpoint.url, 'weight': 1}],
+            'limit': 5,
+            'nb_elems_values': 2,
+            'jobs': [
+                {'name': 'full', 'property': 'P1', 'languages': ['fr', 'en']},
+                {'name': 'ids', 'property': 'P1', 'languages': ['fr'],
+                 'id_file': 'ids.txt'},
+                {'name': 'second', 'property': 'P1', 'languages': ['fr'],
+                 'links_file': 'links.csv', 'properties': {'P2': 'MeSH'},
+                 'all_elem': False},
+            ],
+        }
+        job_path = tmp_path / 'jobs.json'
+        job_path.write_text(json.dumps(spec))
+        output_dir = tmp_path / 'output'
+        argv = [str(job_path), '-o', str(output_dir), '-f', 'jsonl',
+                '-w', '3', '-c', str(tmp_path / 'cache')]
+        assert cli.main(argv) == 0
+
+        header.initialize_user_agent(USER_AGENT_TEST)
+        expected_df = translation.Translator(
+            'P1', ['fr', 'en'], limit=5, url=endpoint.url
+        ).translate()
+        expected_second_df = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'MeSH'}, ['fr'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+
+        # Outputs exist: nothing is queried again
+        nb_queries = len(endpoint.queries)
+        assert cli.main(argv) == 0
+        assert len(endpoint.queries) == nb_queries
+
+        # Output removed: the queries are in the cache
+        (output_dir / 'full.jsonl').unlink()
+        assert cli.main(argv) == 0
+        assert len(endpoint.queries) == nb_queries
+
+    result_df = pd.read_json(output_dir / 'full.jsonl', lines=True,
+                             dtype=False)
+    assert len(result_df) == len(expected_df)
+    assert set(result_df['entity']) == set(expected_df['entity'])
+    ids_df = pd.read_json(output_dir / 'ids.jsonl', lines=True, dtype=False)
+    assert sorted(ids_df['value_property']) == ['001', '001', '005']
+    second_df = pd.read_json(output_dir / 'second.jsonl', lines=True,
+                             dtype=False)
+    assert len(second_df) == len(expected_second_df)
+    assert set(second_df['source_degree']) == {'First', 'Second'}
@@ -0,0 +1,76 @@
+"""Testing endpoints.py."""
+import pandas as pd
+
+from wikidata_property_extraction import endpoints, header, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def test_weighted_choice():
+    """Test if the queries are spread according to the weights."""
+    pool = endpoints.EndpointPool(['a', 'b'], weights=[3, 1])
+    chosen = [pool.choose() for _ in range(8)]
+    assert chosen.count('a') == 6
+    assert chosen.count('b') == 2
+    pool.report_failure('a')
+    assert {pool.choose() for _ in range(4)} == {'b'}
+    assert pool.choose(exclude=['b']) == 'a'
+    assert pool.choose(exclude=['a', 'b']) is None
+
+
+def test_spread_on_replicas():
+    """Test if the pages are spread on two endpoints."""
+    with StubEndpoint() as endpoint_a, StubEndpoint() as endpoint_b:
+        translator = translation.Translator(
+            'P1', ['fr'], limit=5, url=[endpoint_a.url, endpoint_b.url]
+        )
+        result_df = translator.translate()
+        assert len(endpoint_a.queries) == 3
+        assert len(endpoint_b.queries) == 3
+    assert len(result_df) == 24
+
+
+def test_failover():
+    """Test if the queries fail over when an endpoint is down."""
+    with StubEndpoint() as endpoint_a, StubEndpoint() as endpoint_b:
+        expected_df = translation.Translator(
+            'P1', ['fr', 'en'], limit=5, url=endpoint_a.url
+        ).translate()
+
+        endpoint_a.status = 503
+        pool = endpoints.EndpointPool([endpoint_a.url, endpoint_b.url])
+        assert pool.check_health() == {endpoint_a.url: False,
+                                       endpoint_b.url: True}
+        endpoint_a.queries.clear()
+        translator = translation.Translator('P1', ['fr', 'en'], limit=5,
+                                            url=pool)
+        result_df = translator.translate()
+        assert endpoint_a.queries == []
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+    # Both endpoints stopped, the first is not reachable anymore
+    with StubEndpoint() as endpoint_c:
+        translator = translation.Translator(
+            'P2', ['es'], url=[endpoint_a.url, endpoint_c.url]
+        )
+        assert len(translator.translate()) == 7
+
+
+def test_failover_timeout():
+    """Test if the queries fail over when an endpoint never answers."""
+    with StubEndpoint() as endpoint_a, StubEndpoint() as endpoint_b:
+        expected_df = translation.Translator(
+            'P1', ['fr'], limit=5, url=endpoint_b.url
+        ).translate()
+
+        endpoint_a.hang = True
+        pool = endpoints.EndpointPool([endpoint_a.url, endpoint_b.url],
+                                      timeout=0.5)
+        translator = translation.Translator('P1', ['fr'], limit=5, url=pool)
+        result_df = translator.translate()
+        assert len(endpoint_a.queries) == 1
+        assert not pool.is_healthy(endpoint_a.url)
+    pd.testing.assert_frame_equal(result_df, expected_df)
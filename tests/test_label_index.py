@@ -0,0 +1,52 @@
+"""Testing label_index.py."""
+import os
+
+import pandas as pd
+
+from wikidata_property_extraction import label_index, postprocess
+
+
+def test_lookups(tmp_path):
+    """Test the exact and prefix lookups on a small index."""
+    translations_df = pd.DataFrame({
+        'labelFr': ['maladie de Lyme', 'Grippe', 'Q42'],
+        'altFr': ['borréliose|Lyme', '', 'grippe  aviaire'],
+        'labelEn': ['Lyme disease', 'influenza', 'avian flu'],
+        'altEn': ['lyme', 'flu', ''],
+    }, index=pd.Index(['DOID:11729', 'DOID:8469', 'DOID:4492'],
+                      name='value_property'))
+    path = str(tmp_path / 'labels.idx')
+    index = label_index.build_label_index(translations_df, path)
+
+    assert index.languages == ['en', 'fr']
+    assert index.lookup('GRIPPE', 'fr') == ['DOID:8469']
+    assert index.lookup('grippe aviaire', 'fr') == ['DOID:4492']
+    assert index.lookup('Q42', 'fr') == []
+    assert index.lookup('lyme', 'fr') == ['DOID:11729']
+    assert index.lookup('lyme') == ['DOID:11729']
+    assert index.lookup('influenza', 'fr') == []
+    assert index.prefix_lookup('gri', 'fr') == {
+        'grippe': ['DOID:8469'], 'grippe aviaire': ['DOID:4492']
+    }
+    assert index.prefix_lookup('gri', 'fr', max_labels=1) == {
+        'grippe': ['DOID:8469']
+    }
+    assert index.prefix_lookup('zzz') == {}
+    index.close()
+
+    with label_index.LabelIndex(path) as reopened_index:
+        assert reopened_index.lookup('Avian flu', 'en') == ['DOID:4492']
+
+
+def test_translations_only_index(tmp_path):
+    """Test the index of the output of translations_only."""
+    path_file = os.path.dirname(os.path.realpath(__file__))
+    path_json = os.path.join(path_file, 'test_translations_only_input.json')
+    with open(path_json, 'rb') as input_json:
+        input_df = pd.read_json(input_json)
+    translations_df = postprocess.translations_only(input_df)
+
+    path = str(tmp_path / 'labels.idx')
+    with label_index.build_label_index(translations_df, path) as index:
+        label = translations_df['labelEn'].iloc[0].split('|')[0]
+        assert index.lookup(label, 'en') == ['100031']
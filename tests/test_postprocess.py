@@ -25,3 +25,53 @@ def test_translations_only_translation():
     ouput_test_df = postprocess.translations_only(input_df)
 
     assert ouput_test_df.equals(output_df)
+
+
+def _links_input_df():
+    """Return results built from links_df_test.json."""
+    path_file = os.path.dirname(os.path.realpath(__file__))
+    path_json = os.path.join(path_file, 'links_df_test.json')
+    with open(path_json, 'rb') as links_json:
+        links_df = pd.read_json(links_json)
+    input_df = pd.DataFrame({
+        'entity': ['Q' + str(index) for index in range(len(links_df))],
+        'value_property': links_df['value_property'],
+        'labelFr': links_df['id_auxiliary'].astype(str),
+        'altFr': links_df['name_auxiliary'] + '|Q1|'
+        + links_df['id_auxiliary'].astype(str),
+    })
+    return input_df
+
+
+def test_translations_only_processes(monkeypatch):
+    """Test if the multi-process aggregation gives the serial output."""
+    input_df = _links_input_df()
+    monkeypatch.setattr(postprocess.os, 'cpu_count', lambda: 4)
+
+    serial_df = postprocess.translations_only(input_df)
+    parallel_df = postprocess.translations_only(input_df, nb_processes=3,
+                                                min_rows_parallel=0)
+
+    assert len(serial_df) > 1
+    pd.testing.assert_frame_equal(parallel_df, serial_df)
+
+
+def test_translations_only_processes_fallback(monkeypatch):
+    """Test if no process is started for small results or a single CPU."""
+    input_df = _links_input_df()
+    serial_df = postprocess.translations_only(input_df)
+
+    def no_process(*args, **kwargs):
+        raise AssertionError('A process has been started.')
+
+    monkeypatch.setattr(postprocess.concurrent.futures,
+                        'ProcessPoolExecutor', no_process)
+    monkeypatch.setattr(postprocess.os, 'cpu_count', lambda: 4)
+    pd.testing.assert_frame_equal(
+        postprocess.translations_only(input_df, nb_processes=3), serial_df
+    )
+    monkeypatch.setattr(postprocess.os, 'cpu_count', lambda: 1)
+    pd.testing.assert_frame_equal(
+        postprocess.translations_only(input_df, nb_processes=3,
+                                      min_rows_parallel=0), serial_df
+    )
@@ -0,0 +1,104 @@
+"""Testing progress.py."""
+import os
+
+import pandas as pd
+
+from wikidata_property_extraction import batch, header, progress, \
+    second_order, store, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def test_progress_state():
+    """Test the throughput and the ETA."""
+    times = iter([10., 10., 14., 18.])
+    states = []
+    job_progress = progress.Progress(states.append, clock=lambda: next(times))
+    job_progress.add_job(progress.estimate(20, 2, 5))
+    assert states[-1] == progress.ProgressState(
+        0, 8, 0, 20 * 2 * progress.BYTES_PER_ENTITY, 0., None, None, None
+    )
+    job_progress.add_bytes(1000)
+    job_progress.page_done()
+    job_progress.add_bytes(1000)
+    job_progress.page_done()
+    assert states[-1] == progress.ProgressState(2, 8, 2000, 8000, 8.,
+                                                0.25, 250., 24.)
+
+
+def test_progress_translator():
+    """Test the progress of a Translator over all its languages."""
+    states = []
+    with StubEndpoint() as endpoint:
+        translator = translation.Translator(
+            'P1', ['fr', 'en'], limit=5, url=endpoint.url,
+            progress=progress.Progress(states.append)
+        )
+        assert translator.estimate() == progress.estimate(24, 2, 5)
+        translator.translate()
+        # The count of estimate is not sent again
+        assert sum('COUNT' in query for query in endpoint.queries) == 1
+    assert [state.nb_pages_done for state in states] == list(range(11))
+    assert all(state.nb_pages == 10 for state in states)
+    assert states[-1].eta == 0.
+    assert states[-1].nb_bytes == states[-1].nb_bytes_done > 0
+
+
+def test_progress_second_order_and_batch():
+    """Test the estimates and the progress of SecondOrder and batches."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '003'],
+        'id_auxiliary': ['M0', 'M1', 'M9'],
+        'name_auxiliary': ['Aux', 'Aux', 'Aux']
+    })
+    with StubEndpoint() as endpoint:
+        job_progress = progress.Progress()
+        translator = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], limit=10,
+            nb_elems_values=2, url=endpoint.url, progress=job_progress
+        )
+        # 24 entities of P1 by pages of 10, 3 IDs of P2 by pages of 2
+        assert translator.estimate()[:2] == (27, 10)
+        translator.translate()
+        assert job_progress.state()[:2] == (10, 10)
+
+        job_progress = progress.Progress()
+        batch_translator = batch.BatchTranslator(
+            [('P1', ['fr'], ['001', '002', '003']), ('P2', ['fr', 'es'])],
+            limit=5, nb_elems_values=2, url=endpoint.url,
+            progress=job_progress
+        )
+        assert batch_translator.estimate()[:2] == (10, 6)
+        batch_translator.run()
+        assert job_progress.state()[:2] == (6, 6)
+
+
+def test_progress_second_order_registered(tmp_path):
+    """Test if the pages of all the properties are known from the start."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '003'],
+        'id_auxiliary': ['M0', 'M1', 'M9'],
+        'name_auxiliary': ['Aux', 'Aux', 'Aux']
+    })
+    with StubEndpoint() as endpoint, \
+            store.TranslationStore(os.path.join(tmp_path, 'store.db')) \
+            as translation_store:
+        for nb_pages in [10, 6]:
+            states = []
+            translator = second_order.SecondOrder(
+                'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], limit=10,
+                nb_elems_values=2, url=endpoint.url,
+                store=translation_store,
+                progress=progress.Progress(states.append)
+            )
+            translator.translate()
+            # Before the first page, the pages of P2 are already counted.
+            # The second time, the pages of the IDs of P2 in the store are
+            # removed when P2 starts
+            assert all(state.nb_pages == 10 for state in states
+                       if state.nb_pages_done < 6)
+            assert states[-1][:2] == (nb_pages, nb_pages)
+            assert states[-1].eta == 0.
@@ -4,7 +4,8 @@ import os
 
 import pandas as pd
 
-from wikidata_property_extraction import second_order, header
+from wikidata_property_extraction import header, links, second_order
+from tests.sparql_stub import StubEndpoint
 
 USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
     + '(wikidata_extraction@euranova.eu)'
@@ -44,3 +45,168 @@ def test_no_first():
     results_df = translator.translate()
     assert isinstance(results_df, pd.DataFrame)
     assert 'First' not in results_df['source_degree'].unique()
+
+
+def test_chunked_links(tmp_path):
+    """Testing links given by chunks or as a file."""
+    path_file = os.path.dirname(os.path.realpath(__file__))
+    path_json = os.path.join(path_file, 'links_df_test.json')
+    with open(path_json, 'rb') as links_json:
+        links_df = pd.read_json(links_json).astype(str)
+    links_df = links_df.reset_index(drop=True)
+    dict_prop = {'P486': 'MeSH', 'P492': 'OMIM', 'P2892': 'UMLS'}
+    reference = second_order.SecondOrder('P699', links_df, dict_prop,
+                                         ['cs', 'it'], all_elem=False)
+    links_path = str(tmp_path / 'links.csv')
+    links_df.to_csv(links_path, index=False)
+    chunks = (links_df.iloc[start:start + 10]
+              for start in range(0, len(links_df), 10))
+
+    for links_input in [links_path, chunks]:
+        translator = second_order.SecondOrder('P699', links_input, dict_prop,
+                                              ['cs', 'it'], all_elem=False,
+                                              chunksize=7)
+        for prop in ['P699', 'P486', 'P492', 'P2892']:
+            # pylint: disable=protected-access
+            assert translator._get_list_elem_prop(prop) == \
+                reference._get_list_elem_prop(prop)
+        # Read twice, the chunks of the iterator have been spooled
+        for _ in range(2):
+            pd.testing.assert_frame_equal(translator.links_df, links_df)
+
+
+def test_chunked_links_translate():
+    """Testing the join of the translations with links given by chunks."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '900', '003', '001'],
+        'id_auxiliary': ['M1', 'M2', 'M3', 'M1', 'M404'],
+        'name_auxiliary': ['MeSH'] * 5,
+    })
+    chunks = (links_df.iloc[start:start + 2] for start in range(0, 5, 2))
+    with StubEndpoint() as endpoint:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'MeSH'}, ['fr'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        results_df = second_order.SecondOrder(
+            'P1', chunks, {'P2': 'MeSH'}, ['fr'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+    columns = list(expected_df.columns)
+    expected_df = expected_df.sort_values(columns).reset_index(drop=True)
+    results_df = results_df.sort_values(columns).reset_index(drop=True)
+    pd.testing.assert_frame_equal(results_df, expected_df)
+
+
+def test_links_read_once(tmp_path, monkeypatch):
+    """Testing that the links file is read once for all the properties."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '003', '001'],
+        'id_auxiliary': ['M1', 'M2', 'M1', 'U1'],
+        'name_auxiliary': ['MeSH', 'MeSH', 'MeSH', 'UMLS'],
+    })
+    links_path = str(tmp_path / 'links.csv')
+    links_df.to_csv(links_path, index=False)
+    nb_reads = []
+    read_links_chunks = links.read_links_chunks
+
+    def counting_read_links_chunks(*args, **kwargs):
+        nb_reads.append(1)
+        return read_links_chunks(*args, **kwargs)
+
+    monkeypatch.setattr(links, 'read_links_chunks',
+                        counting_read_links_chunks)
+    dict_prop = {'P2': 'MeSH', 'P3': 'UMLS', 'P4': 'MeSH'}
+    with StubEndpoint() as endpoint:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, dict_prop, ['fr'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        results_df = second_order.SecondOrder(
+            'P1', links_path, dict_prop, ['fr'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+    # Once for the IDs, once for the assembly
+    assert len(nb_reads) == 2
+    pd.testing.assert_frame_equal(results_df, expected_df)
+
+
+def test_assemble_deduplicated(tmp_path):
+    """Testing the assembly against a concatenation and drop_duplicates."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '001', '003', '001', '002'],
+        'id_auxiliary': ['M1', 'M2', 'M1', 'M1', 'U1', 'M2'],
+        'name_auxiliary': ['MeSH', 'MeSH', 'MeSH', 'MeSH', 'UMLS', 'MeSH'],
+    })
+    main_df = pd.DataFrame({
+        'entity': ['Q1', 'Q2', 'Q1'], 'value_property': ['001', '002', '001'],
+        'labelFr': ['un', 'deux', 'un'], 'altFr': ['', 'b', ''],
+    })
+    property_translations = [
+        ('MeSH', pd.DataFrame({'entity': ['Q7', 'Q8'],
+                               'value_property': ['M1', 'M2'],
+                               'labelFr': ['sept', 'huit'],
+                               'altFr': ['s', '']})),
+        ('MeSH', pd.DataFrame({'entity': ['Q7', 'Q9'],
+                               'value_property': ['M1', 'M3'],
+                               'labelFr': ['sept', 'neuf'],
+                               'altFr': ['s', 'n']})),
+        ('UMLS', pd.DataFrame({'entity': ['Q10'], 'value_property': ['U1'],
+                               'labelFr': ['dix'], 'altFr': ['']})),
+    ]
+    chunks = [links_df.iloc[start:start + 4] for start in range(0, 6, 4)]
+    expected = [main_df.assign(source_degree='First')]
+    for chunk_df in chunks:
+        for name in ['MeSH', 'UMLS']:
+            for translations_name, translations_df in property_translations:
+                if translations_name == name:
+                    expected.append(translations_df.rename(
+                        {'value_property': 'id_auxiliary'}, axis=1
+                    ).merge(chunk_df[chunk_df['name_auxiliary'] == name],
+                            how='inner', on='id_auxiliary'))
+    expected_df = pd.concat(expected, ignore_index=True)
+    expected_df['source_degree'] = expected_df['source_degree'] \
+        .fillna('Second')
+    expected_df = expected_df[sorted(expected_df.columns)].drop_duplicates()
+
+    for spill_dir in [None, str(tmp_path)]:
+        translator = second_order.SecondOrder(
+            'P1', iter(chunks), {'P2': 'MeSH', 'P3': 'UMLS'}, ['fr'],
+            spill_dir=spill_dir
+        )
+        # pylint: disable=protected-access
+        results_df = translator._assemble(main_df.copy(),
+                                          iter(property_translations))
+        pd.testing.assert_frame_equal(results_df, expected_df)
+    assert len(results_df) == 6
+    assert os.listdir(tmp_path) == []
+
+
+def test_assembly_many_frames():
+    """Testing the deduplication over many frames of various sizes."""
+    frames = [pd.DataFrame({'value_property': [str(row % 37) for row
+                                               in range(start, start + size)],
+                            'entity': ['Q' + str(row % 11) for row
+                                       in range(start, start + size)],
+                            'labelFr': ['label ' + str(start)] * size})
+              for start, size in [(0, 5), (3, 40), (10, 1), (0, 0), (7, 90),
+                                  (50, 20), (1, 300), (400, 3)]]
+    expected_df = pd.concat(frames, ignore_index=True) \
+        .drop_duplicates(['entity', 'value_property'])
+    assembly = second_order._Assembly()  # pylint: disable=protected-access
+    for frame_df in frames:
+        assembly.add(frame_df)
+    pd.testing.assert_frame_equal(assembly.result(),
+                                  expected_df[sorted(expected_df.columns)])
+
+
+def test_assembly_hash_collision(monkeypatch):
+    """Testing that a row colliding with the hash of another one is lost."""
+    def same_hash(frame_df, index=False):
+        return pd.Series([7] * len(frame_df), dtype='uint64')
+
+    monkeypatch.setattr(pd.util, 'hash_pandas_object', same_hash)
+    assembly = second_order._Assembly()  # pylint: disable=protected-access
+    assembly.add(pd.DataFrame({'entity': ['Q1'], 'value_property': ['1']}))
+    assembly.add(pd.DataFrame({'entity': ['Q2'], 'value_property': ['2']}))
+    assert assembly.result()['entity'].tolist() == ['Q1']
@@ -0,0 +1,71 @@
+"""Testing sharding.py."""
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+from wikidata_property_extraction import header, sharding, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+
+def test_sharding_processes(tmp_path):
+    """Test if workers in several processes give the result of translate."""
+    path = os.path.join(tmp_path, 'queue.db')
+    with StubEndpoint() as endpoint:
+        translator = translation.Translator('P1', ['fr', 'en'], limit=5,
+                                            url=endpoint.url)
+        expected_df = translator.translate()
+        with sharding.ShardQueue(path) as queue:
+            assert queue.create(translator) == 10
+            # Creating the same job again does nothing
+            assert queue.create(translator) == 10
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=sharding.run_worker,
+                                     args=(path, endpoint.url))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+        # 1 count (kept by the translator for create) and 10 pages for
+        # translate, then each page queried once by the workers
+        assert len(endpoint.queries) == 11 + 10
+    with sharding.ShardQueue(path) as queue:
+        assert queue.progress() == {'pending': 0, 'running': 0, 'done': 10}
+        pd.testing.assert_frame_equal(queue.merge(), expected_df)
+
+
+def test_sharding_id_list(tmp_path):
+    """Test if a job on a list of IDs is sharded and merged."""
+    id_list = ['001', '003', '004', '010', '404']
+    with StubEndpoint() as endpoint, \
+            sharding.ShardQueue(os.path.join(tmp_path, 'queue.db')) as queue:
+        translator = translation.Translator('P1', ['fr', 'en'],
+                                            nb_elems_values=2,
+                                            url=endpoint.url,
+                                            label_service=False)
+        expected_df = translator.translate(id_list)
+        assert queue.create(translator, id_list) == 6
+        assert sharding.run_worker(queue.path, endpoint.url) == 6
+        pd.testing.assert_frame_equal(queue.merge(), expected_df)
+
+
+def test_sharding_lease(tmp_path):
+    """Test if a shard not completed is claimed again after the lease."""
+    path = os.path.join(tmp_path, 'queue.db')
+    with StubEndpoint() as endpoint, sharding.ShardQueue(path) as queue:
+        translator = translation.Translator('P2', ['es'], limit=5,
+                                            url=endpoint.url)
+        queue.create(translator)
+        first_shard = queue.claim('crashed')
+        assert queue.claim('other')[0] != first_shard[0]
+        with pytest.raises(ValueError):
+            queue.merge()
+        with sharding.ShardQueue(path, lease=0) as other_queue:
+            assert other_queue.claim('other') == first_shard
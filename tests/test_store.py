@@ -0,0 +1,121 @@
+"""Testing store.py."""
+import os
+import re
+
+import pandas as pd
+
+from wikidata_property_extraction import batch, header, second_order, \
+    store, translation
+from tests.sparql_stub import StubEndpoint
+
+USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
+    + '(wikidata_extraction@euranova.eu)'
+header.initialize_user_agent(USER_AGENT_TEST)
+
+ID_LIST = ['001', '002', '010', '404']
+ID_LIST_MORE = ['001', '002', '010', '404', '003', '020']
+
+
+def _queried_ids(queries):
+    """Return the IDs in the VALUES of the queries."""
+    return {current_id for query in queries
+            for current_id in re.findall(r'\("([^"]*)"\)', query)}
+
+
+def test_store_cold_same_as_translator(tmp_path):
+    """Test if a translation with an empty store is not changed."""
+    with StubEndpoint() as endpoint, \
+            store.TranslationStore(os.path.join(tmp_path, 'store.db')) \
+            as translation_store:
+        expected_df = translation.Translator(
+            'P1', ['fr', 'en'], nb_elems_values=2, url=endpoint.url
+        ).translate(ID_LIST)
+        result_df = translation.Translator(
+            'P1', ['fr', 'en'], nb_elems_values=2, url=endpoint.url,
+            store=translation_store
+        ).translate(ID_LIST)
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_store_only_new_ids(tmp_path):
+    """Test if only the IDs which are not in the store are queried."""
+    with StubEndpoint() as endpoint, \
+            store.TranslationStore(os.path.join(tmp_path, 'store.db')) \
+            as translation_store:
+        expected_df = translation.Translator(
+            'P1', ['fr', 'en'], url=endpoint.url
+        ).translate(ID_LIST_MORE)
+        translator = translation.Translator('P1', ['fr', 'en'],
+                                            url=endpoint.url,
+                                            store=translation_store)
+        translator.translate(ID_LIST)
+        nb_queries = len(endpoint.queries)
+        result_df = translator.translate(ID_LIST_MORE)
+        new_queries = endpoint.queries[nb_queries:]
+        # A single query per language, with only the new IDs
+        assert len(new_queries) == 2
+        assert _queried_ids(new_queries) == {'003', '020'}
+        # Nothing is queried when all the IDs are stored, 404 included
+        translator.translate(ID_LIST)
+        assert len(endpoint.queries) == nb_queries + 2
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_store_max_age(tmp_path):
+    """Test if the translations too old are queried again."""
+    with StubEndpoint() as endpoint, \
+            store.TranslationStore(os.path.join(tmp_path, 'store.db')) \
+            as translation_store:
+        translator = translation.Translator('P2', ['es'], url=endpoint.url,
+                                            store=translation_store)
+        translator.translate(['M0', 'M1'])
+        nb_queries = len(endpoint.queries)
+        translator.translate(['M0', 'M1'])
+        assert len(endpoint.queries) == nb_queries
+        translation_store.max_age = 0
+        translator.translate(['M0', 'M1'])
+        assert len(endpoint.queries) == nb_queries + 1
+
+
+def test_store_persistent(tmp_path):
+    """Test if the store is shared between runs and with the batches."""
+    path = os.path.join(tmp_path, 'store.db')
+    with StubEndpoint() as endpoint:
+        with store.TranslationStore(path) as translation_store:
+            translation.Translator('P1', ['fr'], url=endpoint.url,
+                                   store=translation_store).translate()
+        nb_queries = len(endpoint.queries)
+        with store.TranslationStore(path) as translation_store:
+            batch_translator = batch.BatchTranslator(
+                [('P1', ['fr'], ID_LIST[:3])], url=endpoint.url,
+                store=translation_store
+            )
+            result_df, = batch_translator.run()
+        assert len(endpoint.queries) == nb_queries
+        expected_df = translation.Translator(
+            'P1', ['fr'], url=endpoint.url
+        ).translate(ID_LIST[:3])
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_store_second_order(tmp_path):
+    """Test if a second order extraction gives the same result with a
+    store."""
+    links_df = pd.DataFrame({
+        'value_property': ['001', '002', '003'],
+        'id_auxiliary': ['M0', 'M1', 'M9'],
+        'name_auxiliary': ['Aux', 'Aux', 'Aux']
+    })
+    with StubEndpoint() as endpoint, \
+            store.TranslationStore(os.path.join(tmp_path, 'store.db')) \
+            as translation_store:
+        expected_df = second_order.SecondOrder(
+            'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], all_elem=False,
+            url=endpoint.url
+        ).translate()
+        for _ in range(2):
+            result_df = second_order.SecondOrder(
+                'P1', links_df, {'P2': 'Aux'}, ['fr', 'es'], all_elem=False,
+                url=endpoint.url, store=translation_store
+            ).translate()
+            pd.testing.assert_frame_equal(result_df, expected_df)
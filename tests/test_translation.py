@@ -1,7 +1,13 @@
 """Testing translation.py."""
+import importlib
+import logging
+import subprocess
+import sys
+
 import pandas as pd
 
 from wikidata_property_extraction import translation, header
+from tests.sparql_stub import StubEndpoint
 
 USER_AGENT_TEST = 'WikidataExtractionPythonTest/0.1 '\
     + '(wikidata_extraction@euranova.eu)'
@@ -40,3 +46,54 @@ def test_end_to_end_list():
     translator = translation.Translator('P2586', ['en', 'fr'])
     result_df = translator.translate(id_list=['01', '02', '03', '04'])
     assert isinstance(result_df, pd.DataFrame)
+
+
+def test_lazy_import():
+    """Test if building a query does not import the heavy dependencies."""
+    code = 'import logging, sys\n'\
+        + 'from wikidata_property_extraction import header, translation\n'\
+        + 'header.initialize_user_agent("test")\n'\
+        + 'translation.Translator("P699", ["fr"])._format_query("fr")\n'\
+        + 'assert not logging.getLogger().handlers\n'\
+        + 'assert "pandas" not in sys.modules\n'\
+        + 'assert "requests" not in sys.modules\n'\
+        + 'assert "tqdm" not in sys.modules\n'
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_without_label_service():
+    """Test if the queries without label service give the same result."""
+    with StubEndpoint() as endpoint:
+        for id_list in [None, ['001', '003', '004', '404']]:
+            translator = translation.Translator('P1', ['fr', 'en'], limit=5,
+                                                nb_elems_values=2,
+                                                url=endpoint.url)
+            expected_df = translator.translate(id_list)
+            translator.label_service = False
+            nb_queries = len(endpoint.queries)
+            result_df = translator.translate(id_list)
+            assert not any('SERVICE' in query or 'GROUP_CONCAT' in query
+                           for query in endpoint.queries[nb_queries:])
+            pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_user_agent_header():
+    """Test if the User-Agent is sent as a header."""
+    with StubEndpoint() as endpoint:
+        translation.Translator('P1', ['fr'],
+                               url=endpoint.url).translate(['001'])
+    assert endpoint.user_agents
+    assert all(user_agent == USER_AGENT_TEST
+               for user_agent in endpoint.user_agents)
+
+
+def test_no_logger_level():
+    """Test if the modules leave the level of the logs to the application."""
+    modules = ['arrow_translation', 'async_translation', 'batch', 'cli',
+               'endpoints', 'label_index', 'links', 'postprocess',
+               'progress', 'second_order', 'sharding', 'store',
+               'translation']
+    for module in modules:
+        importlib.import_module('wikidata_property_extraction.' + module)
+        logger = logging.getLogger('wikidata_property_extraction.' + module)
+        assert logger.level == logging.NOTSET
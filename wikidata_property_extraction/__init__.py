@@ -1,2 +1,7 @@
 """Wikidata extraction."""
+import logging
+
 from wikidata_property_extraction.version import __version__
+
+# The logs are only shown if the application configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
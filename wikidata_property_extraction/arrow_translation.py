@@ -0,0 +1,654 @@
+"""Arrow translation classes.
+
+Counterparts of Translator and SecondOrder working on Arrow tables: the
+results of the queries are decoded by the JSON reader of Arrow straight
+into Arrow arrays, the pages and the languages are assembled with Arrow
+(concatenating tables only references their chunks) and translations_only
+runs on the Arrow compute kernels. pyarrow has to be installed (pip install
+wikidata_property_extraction[arrow]).
+
+The tables can be converted to pandas with to_pandas, which keeps the Arrow
+arrays as the data of the columns instead of copying them into Python
+objects.
+"""
+import logging
+
+from wikidata_property_extraction import postprocess, second_order, \
+    translation
+from wikidata_property_extraction.lazy_import import LazyModule
+
+np = LazyModule('numpy')
+
+logger = logging.getLogger(__name__)
+
+KEYS = ['entity', 'value_property']
+
+
+def _import_pyarrow():
+    """Import pyarrow.
+
+    Raises:
+        ImportError: when pyarrow is not installed.
+
+    Returns:
+        (module, module): pyarrow and pyarrow.compute, pyarrow.json is
+            imported too.
+
+    """
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.json  # noqa: F401
+    except ImportError:
+        err_msg = 'pyarrow is needed for the Arrow classes, install it with '\
+            + 'pip install wikidata_property_extraction[arrow]'
+        logger.error(err_msg)
+        raise ImportError(err_msg)
+    return pyarrow, pyarrow.compute
+
+
+def json_to_table(content):
+    """Decode the result of a query into an Arrow table.
+
+    The result is parsed by the JSON reader of Arrow straight into Arrow
+    arrays, without building Python objects for the bindings.
+
+    Args:
+        content (bytes): a result from a query to WikiData SPARQL, in the
+            SPARQL JSON format.
+
+    Raises:
+        pyarrow.ArrowInvalid: when the result is not a json.
+
+    Returns:
+        pyarrow.Table: a string column per variable of the query, null when
+            the variable is not bound.
+
+    """
+    pa, _ = _import_pyarrow()
+    try:
+        # The result is a single JSON object, possibly on several lines
+        document = pa.json.read_json(
+            pa.BufferReader(content),
+            read_options=pa.json.ReadOptions(
+                use_threads=False, block_size=max(len(content), 1)
+            ),
+            parse_options=pa.json.ParseOptions(newlines_in_values=True)
+        )
+    except pa.ArrowInvalid:
+        logger.error("The request have work but the result is not a json.")
+        raise
+    variables = document['head'].combine_chunks().field('vars')[0].as_py()
+    bindings = document['results'].combine_chunks().field('bindings')
+    bindings = bindings.flatten()
+    columns = {}
+    for variable in variables:
+        if not isinstance(bindings, pa.StructArray) \
+                or bindings.type.get_field_index(variable) < 0:
+            # Never bound in the result
+            columns[variable] = pa.nulls(len(bindings), type=pa.string())
+            continue
+        binding = bindings.field(variable)
+        # flatten gives the null of the unbound rows to the values too
+        value = binding.flatten()[binding.type.get_field_index('value')]
+        columns[variable] = value.cast(pa.string())
+    return pa.table(columns)
+
+
+def group_labels(table, language):
+    """Group the labels of the rows of a query without label service.
+
+    Arrow version of Translator._group_labels.
+
+    Args:
+        table (pyarrow.Table): a row per label or alternative label.
+        language (string): the language of the query.
+
+    Returns:
+        pyarrow.Table: a row per entity.
+
+    """
+    pa, pc = _import_pyarrow()
+    language_cap = language.capitalize()
+    label_column = 'label' + language_cap
+    alt_column = 'alt' + language_cap
+    grouped = table.group_by(KEYS, use_threads=False).aggregate(
+        [(label_column, 'first')]
+    )
+    # The alternative labels in the order of their first row, as joined by
+    # the label service
+    alt_table = table.filter(pc.is_valid(table[alt_column]))
+    alt_table = alt_table.append_column(
+        'row', pa.array(range(alt_table.num_rows), type=pa.int64())
+    )
+    alt_table = alt_table.group_by(KEYS + [alt_column], use_threads=False) \
+        .aggregate([('row', 'min')]).sort_by('row_min')
+    alt_table = alt_table.group_by(KEYS, use_threads=False) \
+        .aggregate([(alt_column, 'list')])
+    alt_table = pa.table({
+        'entity': alt_table['entity'],
+        'value_property': alt_table['value_property'],
+        alt_column: pc.binary_join(alt_table[alt_column + '_list'], '|'),
+    })
+    grouped = grouped.join(alt_table, KEYS, join_type='left outer')
+    # Same fallback as the label service
+    entity_ids = pc.replace_substring_regex(grouped['entity'], '^.*/', '')
+    return pa.table({
+        'entity': grouped['entity'],
+        'value_property': grouped['value_property'],
+        label_column: pc.coalesce(grouped[label_column + '_first'],
+                                  entity_ids),
+        alt_column: pc.fill_null(grouped[alt_column], ''),
+    })
+
+
+def merge_tables(query_results):
+    """Merge the results of the queries into a single table.
+
+    Arrow version of Translator._merge_results, with the same columns and
+    rows in the same order. The pairs (entity, value_property) are unique in
+    the results of a language, as they are grouped by the queries.
+
+    Args:
+        query_results (iterable of (pyarrow.Table, bool)): the result of
+            each query, with the flag indicating if it is the last query of
+            its language.
+
+    Returns:
+        pyarrow.Table: the results of all the languages joined on
+            ['entity', 'value_property'].
+
+    """
+    pa, _ = _import_pyarrow()
+    language_tables = []
+    page_tables = []
+    query_table = None
+    for query_table, flag_lang in query_results:
+        page_tables.append(query_table)
+        if flag_lang:
+            # Only references the chunks of the pages
+            language_tables.append(_concat_pages(page_tables))
+            page_tables = []
+    # The pages are then only referenced by language_tables, released as
+    # the languages are aligned
+    del query_table
+    if not language_tables:
+        return pa.table({key: pa.array([], type=pa.string()) for key in KEYS})
+    return _align_languages(language_tables)
+
+
+def _concat_pages(page_tables):
+    """Concatenate the tables of the pages of a language.
+
+    Args:
+        page_tables (list of pyarrow.Table): the table of each page.
+
+    Returns:
+        pyarrow.Table: the keys first, then the other columns sorted.
+
+    """
+    pa, _ = _import_pyarrow()
+    language_table = pa.concat_tables(page_tables, promote_options='default')
+    return language_table.select(
+        KEYS + sorted(column for column in language_table.column_names
+                      if column not in KEYS)
+    )
+
+
+def _key_ranks(language_tables, key):
+    """Encode a key column of the languages as ranks of its values.
+
+    Args:
+        language_tables (list of pyarrow.Table): the table of each language.
+        key (string): the key column.
+
+    Returns:
+        (pyarrow.Array, np.ndarray, list of np.ndarray): the distinct values,
+            their indices sorted by value and for each language the rank of
+            the value of each row among the sorted values.
+
+    """
+    pa, pc = _import_pyarrow()
+    # A single hash table over the chunks of all the languages, the chunks
+    # share the dictionary of the distinct values
+    encoded = pc.dictionary_encode(pa.chunked_array(
+        [chunk for table in language_tables for chunk in table[key].chunks],
+        type=pa.string()
+    ))
+    if encoded.num_chunks > 0:
+        values = encoded.chunk(0).dictionary
+    else:
+        values = pa.array([], type=pa.string())
+    order = pc.sort_indices(values).to_numpy()
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    language_ranks = []
+    chunks = iter(encoded.chunks)
+    for table in language_tables:
+        indices = [next(chunks).indices.to_numpy()
+                   for _ in range(table[key].num_chunks)]
+        language_ranks.append(
+            ranks[np.concatenate(indices)] if indices
+            else np.empty(0, dtype=np.int64)
+        )
+    return values, order, language_ranks
+
+
+def _align_languages(language_tables):
+    """Outer join of the languages on ['entity', 'value_property'].
+
+    The keys are replaced by integer codes ordered as the keys, so the rows
+    of each language are aligned on the sorted distinct keys with integer
+    arrays, and each column is gathered once, without the transient tables
+    of a hash join.
+
+    Args:
+        language_tables (list of pyarrow.Table): the table of each language,
+            the keys first, emptied as the languages are gathered.
+
+    Returns:
+        pyarrow.Table: the keys sorted and the columns of each language,
+            null when the key is not in the language.
+
+    """
+    pa, pc = _import_pyarrow()
+    entities, entity_order, entity_ranks = _key_ranks(language_tables,
+                                                      'entity')
+    values, value_order, value_ranks = _key_ranks(language_tables,
+                                                  'value_property')
+    nb_values = len(value_order)
+    language_codes = [entity_rank * nb_values + value_rank
+                      for entity_rank, value_rank
+                      in zip(entity_ranks, value_ranks)]
+    del entity_ranks, value_ranks
+    codes = np.unique(np.concatenate(language_codes))
+    # The keys of the languages are released before gathering the keys of
+    # the result
+    for index, language_table in enumerate(language_tables):
+        language_tables[index] = language_table.drop_columns(KEYS)
+    del language_table
+    columns = {
+        'entity': pc.take(entities, entity_order[codes // nb_values]),
+        'value_property': pc.take(values, value_order[codes % nb_values]),
+    }
+    del entities, values
+    # Each language is released once its columns are gathered
+    language_tables.reverse()
+    language_codes.reverse()
+    while language_tables:
+        language_table = language_tables.pop()
+        language_code = language_codes.pop()
+        # Row of each key in the language, null when it is missing
+        rows = np.zeros(len(codes), dtype=np.int64)
+        found = np.zeros(len(codes), dtype=bool)
+        if len(language_code) > 0:
+            sorter = np.argsort(language_code)
+            positions = np.searchsorted(language_code, codes, sorter=sorter)
+            rows = sorter[np.minimum(positions, len(language_code) - 1)]
+            found = language_code[rows] == codes
+        labels_table = language_table.take(pa.array(rows, mask=~found))
+        for column in labels_table.column_names:
+            columns[column] = labels_table[column]
+        del language_table, labels_table
+    return pa.table(columns)
+
+
+def _distinct_lists(codes, labels, nb_keys):
+    """Group the labels on their key, without duplicates and sorted.
+
+    The rows are sorted on the key then the label, so the duplicates are
+    next to each other and are dropped without hashing the labels.
+
+    Args:
+        codes (pyarrow.Array): the position of the key of each label, none
+            of them null.
+        labels (pyarrow.Array): the labels, none of them null.
+        nb_keys (int): the number of keys.
+
+    Returns:
+        pyarrow.ListArray: the labels of each key, empty when the key has
+            no labels.
+
+    """
+    pa, pc = _import_pyarrow()
+    order = pc.sort_indices(pa.table({'key': codes, 'label': labels}),
+                            sort_keys=[('key', 'ascending'),
+                                       ('label', 'ascending')])
+    codes = np.asarray(pc.take(codes, order))
+    labels = pc.take(labels, order)
+    if isinstance(labels, pa.ChunkedArray):
+        labels = labels.combine_chunks()
+    del order
+    keep = np.ones(len(codes), dtype=bool)
+    if len(codes) > 1:
+        keep[1:] = (codes[1:] != codes[:-1]) | np.asarray(pc.not_equal(
+            labels.slice(1), labels.slice(0, len(labels) - 1)
+        ))
+    offsets = np.zeros(nb_keys + 1, dtype=np.int32)
+    np.cumsum(np.bincount(codes[keep], minlength=nb_keys),
+              out=offsets[1:])
+    return pa.ListArray.from_arrays(pa.array(offsets),
+                                    labels.filter(pa.array(keep)))
+
+
+def translations_only(table):
+    """Arrow version of postprocess.translations_only.
+
+    Args:
+        table (pyarrow.Table): the result of ArrowTranslator or
+            ArrowSecondOrder.
+
+    Raises:
+        AttributeError: when the column value_property is missing.
+
+    Returns:
+        pyarrow.Table: the column value_property, sorted, and a column per
+            column of labels with the labels of the value without
+            duplicates, sorted and separated by '|'.
+
+    """
+    pa, pc = _import_pyarrow()
+    if 'value_property' not in table.column_names:
+        error_str = 'The column value_property is mandatory in links_df'
+        logger.error(error_str)
+        raise AttributeError(error_str)
+
+    drop_columns = ['entity', 'value_property', 'source_degree']
+    if 'id_auxiliary' in table.column_names:
+        drop_columns += ['id_auxiliary', 'name_auxiliary']
+    label_columns = [column for column in table.column_names
+                     if column not in drop_columns]
+
+    values = table['value_property']
+    keys = pc.unique(values)
+    keys = pc.take(keys, pc.sort_indices(keys))
+    # The labels are grouped on the position of the value in the keys, so
+    # the values are not copied for each label
+    codes = pc.index_in(values, value_set=keys)
+    columns = {'value_property': keys}
+    for column in label_columns:
+        labels = pc.split_pattern(table[column].cast(pa.string()), '|')
+        codes_labels = pc.take(codes, pc.list_parent_indices(labels))
+        labels = pc.list_flatten(labels)
+        # Removing the name of WikiData when there is no labels in the
+        # language
+        mask = pc.invert(pc.match_substring_regex(
+            labels, '^' + postprocess.ENTITY_NAME_REGEX.pattern
+        ))
+        labels = _distinct_lists(codes_labels.filter(mask),
+                                 labels.filter(mask), len(keys))
+        del codes_labels, mask
+        columns[column] = pc.binary_join(labels, '|')
+        del labels
+    return pa.table(columns)
+
+
+def to_pandas(table):
+    """Convert a table to a DataFrame without copying its columns.
+
+    Args:
+        table (pyarrow.Table): the table.
+
+    Returns:
+        pd.DataFrame: the DataFrame, with columns backed by the Arrow arrays
+            (pd.ArrowDtype).
+
+    """
+    _import_pyarrow()
+    return table.to_pandas(types_mapper=translation.pd.ArrowDtype)
+
+
+class ArrowTranslator(translation.Translator):
+    """ArrowTranslator class.
+
+    Same as Translator, but translate returns a pyarrow.Table. The store is
+    not supported.
+    """
+
+    def __init__(self, property_wiki, languages_list,
+                 limit=5000, nb_elems_values=200,
+                 url='https://query.wikidata.org/sparql', session=None,
+                 label_service=True, progress=None):
+        """Init ArrowTranslator class.
+
+        Args:
+            property_wiki (string): the name of of the property in format
+                'PXX'.
+            languages_list (list): list of all the languages we want a
+                translation, see Translator.
+            limit (int, optional): the number of elements returned in one
+                query, see Translator. Defaults to 5000.
+            nb_elems_values (int, optional): number of elements put in VALUES,
+                see Translator. Defaults to 200.
+            url (str, optional): url to wikidata or to a local sparql endpoint
+                of wikidata, a list of urls or an endpoints.EndpointPool.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            session (requests.Session, optional): session used to send the
+                queries. Defaults to None.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            progress (progress.Progress, optional): follows the pages of
+                translate. Defaults to None.
+
+        """
+        _import_pyarrow()
+        super().__init__(property_wiki, languages_list, limit=limit,
+                         nb_elems_values=nb_elems_values, url=url,
+                         session=session, label_service=label_service,
+                         progress=progress)
+
+    def _request_page(self, query):
+        """Make the request of the query of a page.
+
+        Args:
+            query (string): the SPARQL query.
+
+        Returns:
+            bytes: the result of the query, decoded by _parse_page.
+
+        """
+        return self._request_content(query)
+
+    def _parse_page(self, content, language):
+        """Decode the result of the query of a page into an Arrow table.
+
+        Args:
+            content (bytes): the result of the query of _format_query.
+            language (string): the language of the query.
+
+        Returns:
+            pyarrow.Table: one row per entity, with its label and
+                alternative labels.
+
+        """
+        page_table = json_to_table(content)
+        if self._label_service:
+            return page_table
+        return group_labels(page_table, language)
+
+    @staticmethod
+    def _merge_results(query_results):
+        """Merge the results of the queries, see merge_tables."""
+        return merge_tables(query_results)
+
+    def translate(self, id_list=None):
+        """translate, Arrow version of Translator.translate.
+
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Returns:
+            pyarrow.Table: the same columns and rows as the result of
+                Translator.translate.
+
+        """
+        self._id_list = id_list
+        return self._merge_results(self._query_generator())
+
+
+class ArrowSecondOrder(second_order.SecondOrder):
+    """ArrowSecondOrder class.
+
+    Same as SecondOrder, but translate returns a pyarrow.Table and the
+    translations are joined with the links and deduplicated with Arrow. The
+    rows are not in the order of SecondOrder.translate. The store is not
+    supported.
+    """
+
+    def __init__(self, main_property_id, links_df, dict_properties,
+                 languages_list, limit=5000, all_elem=True,
+                 nb_elems_values=100, url='https://query.wikidata.org/sparql',
+                 chunksize=100000, label_service=True, progress=None):
+        """Init ArrowSecondOrder class.
+
+        Args:
+            main_property_id (int): id of the main property.
+            links_df (pd.DataFrame, string or iterable of pd.DataFrame):
+                the links between the different ontologies, see SecondOrder.
+            dict_properties (dict): Dictionnary of the links between the name
+                of the external ontologies and the corresponding proporties in
+                WikiData. Format: 'ontology_name': 'wikidata_id'.
+            languages_list (list): list of all the languages we want a
+                translation.
+            limit (int, optional): the number of elements returned in one
+                query. Defaults to 5000.
+            all_elem (bool, optional): a flag, True if extracts all the label
+                of the main property, False is the extraction is only for the
+                IDs in the links_df DataFrame. Defauts to True.
+            nb_elems_values (int, optional): number of elements put in VALUES,
+                small number to avoid error 414.
+            url (str, optional): url to wikidata or to a local sparql endpoint
+                of wikidata, a list of urls or an endpoints.EndpointPool.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            chunksize (int, optional): the number of rows of a chunk when
+                links_df is a file. Defaults to 100000.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            progress (progress.Progress, optional): follows the pages of
+                all the properties. Defaults to None.
+
+        """
+        _import_pyarrow()
+        super().__init__(main_property_id, links_df, dict_properties,
+                         languages_list, limit=limit, all_elem=all_elem,
+                         nb_elems_values=nb_elems_values, url=url,
+                         chunksize=chunksize, label_service=label_service,
+                         progress=progress)
+
+    def _make_translator(self, prop):
+        """Create the Arrow translator of a property.
+
+        Args:
+            prop (string): A WikiData property.
+
+        Returns:
+            ArrowTranslator: the translator of the property.
+
+        """
+        translator = ArrowTranslator(
+            prop, self._languages_list, limit=self._limit,
+            nb_elems_values=self._nb_elems_values, url=self._endpoint_pool,
+            label_service=self._label_service, progress=self._progress
+        )
+        return self._share_state(translator, prop)
+
+    def _iter_links_tables(self):
+        """Iterate over the chunks of the links as Arrow tables.
+
+        Yields:
+            pyarrow.Table: a chunk of the links, with string columns.
+
+        """
+        pa, _ = _import_pyarrow()
+        for chunk_df in self._links_source.chunks():
+            links_table = pa.Table.from_pandas(chunk_df, preserve_index=False)
+            yield links_table.cast(pa.schema(
+                [(column, pa.string()) for column in links_table.column_names]
+            ))
+
+    def _assemble(self, main_table, property_translations):
+        """Assemble the translations of the main and auxiliary properties.
+
+        Same steps as SecondOrder._assemble: the links are read once and
+        the rows are deduplicated on their key columns as they are joined.
+
+        Args:
+            main_table (pyarrow.Table): the translations of the main
+                property.
+            property_translations (iterable of (string, pyarrow.Table)): the
+                name and the translations of each auxiliary property.
+
+        Returns:
+            pyarrow.Table: the result of translate, with the columns sorted
+                as in SecondOrder.translate.
+
+        """
+        pa, pc = _import_pyarrow()
+        assembly = _ArrowAssembly()
+        assembly.add(main_table.append_column(
+            'source_degree', pa.repeat('First', main_table.num_rows)
+        ))
+        tables_by_name = {}
+        for property_name, property_table in property_translations:
+            tables_by_name.setdefault(property_name, []).append(
+                property_table.rename_columns([
+                    'id_auxiliary' if column == 'value_property' else column
+                    for column in property_table.column_names
+                ])
+            )
+
+        logger.info('The translations of all the properties have ' +
+                    'been obtained.')
+
+        # Join with the links chunk by chunk
+        for links_table in self._iter_links_tables():
+            for property_name, property_tables in tables_by_name.items():
+                name_links_table = links_table.filter(
+                    pc.equal(links_table['name_auxiliary'], property_name)
+                )
+                for property_table in property_tables:
+                    merged_table = property_table.join(name_links_table,
+                                                       'id_auxiliary',
+                                                       join_type='inner')
+                    assembly.add(merged_table.append_column(
+                        'source_degree',
+                        pa.repeat('Second', merged_table.num_rows)
+                    ))
+
+        return assembly.result()
+
+
+class _ArrowAssembly(second_order._Assembly):
+    """Rows of the result of ArrowSecondOrder, without duplicates.
+
+    The tables are deduplicated as they are added, on the same key columns
+    and with the same hashes as the frames of SecondOrder.
+    """
+
+    def add(self, table):
+        """Add the rows of a table which are not already in the assembly.
+
+        Args:
+            table (pyarrow.Table): the table.
+
+        """
+        pa, _ = _import_pyarrow()
+        key_columns = [column for column in table.column_names
+                       if not second_order.LABEL_COLUMN_REGEX.match(column)]
+        keep = self._new_rows(to_pandas(table.select(key_columns)))
+        self._frames.append(table.filter(pa.array(keep, type=pa.bool_())))
+
+    def result(self):
+        """Concatenate the tables added.
+
+        Returns:
+            pyarrow.Table: the rows without duplicates, with the columns
+                sorted.
+
+        """
+        pa, _ = _import_pyarrow()
+        result_table = pa.concat_tables(self._frames,
+                                        promote_options='default')
+        self._frames = []
+        return result_table.select(sorted(result_table.column_names))
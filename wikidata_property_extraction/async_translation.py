@@ -0,0 +1,488 @@
+"""Asynchronous translation classes.
+
+Asyncio counterparts of Translator and SecondOrder, to run extractions from
+an asyncio application without blocking its event loop. The queries are
+built as in the synchronous classes and sent with aiohttp, which has to be
+installed (pip install wikidata_property_extraction[async]). The blocking
+steps (reading the links, the store, assembling the results) run in the
+default executor of the loop, only the queries run on the loop.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+
+from wikidata_property_extraction import header, progress, second_order, \
+    translation
+
+logger = logging.getLogger(__name__)
+
+
+def _import_aiohttp():
+    """Import aiohttp.
+
+    Raises:
+        ImportError: when aiohttp is not installed.
+
+    Returns:
+        module: aiohttp.
+
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        err_msg = 'aiohttp is needed for the asynchronous classes, install '\
+            + 'it with pip install wikidata_property_extraction[async]'
+        logger.error(err_msg)
+        raise ImportError(err_msg)
+    return aiohttp
+
+
+async def _run_blocking(function, *args):
+    """Run a blocking function in the default executor of the loop.
+
+    Args:
+        function (callable): the function.
+        *args: the arguments of the function.
+
+    Returns:
+        object: the result of the function.
+
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, function, *args)
+
+
+class AsyncTranslator(translation.Translator):
+    """AsyncTranslator class.
+
+    Same as Translator, but translate is a coroutine and the queries of the
+    pages are sent concurrently.
+    """
+
+    def __init__(self, property_wiki, languages_list,
+                 limit=5000, nb_elems_values=200,
+                 url='https://query.wikidata.org/sparql', session=None,
+                 max_concurrent_queries=4, store=None, label_service=True,
+                 progress=None):
+        """Init AsyncTranslator class.
+
+        Args:
+            property_wiki (string): the name of of the property in format
+                'PXX'.
+            languages_list (list): list of all the languages we want a
+                translation, see Translator.
+            limit (int, optional): the number of elements returned in one
+                query, see Translator. Defaults to 5000.
+            nb_elems_values (int, optional): number of elements put in VALUES,
+                see Translator. Defaults to 200.
+            url (str, optional): url to wikidata or to a local sparql endpoint
+                of wikidata, a list of urls or an endpoints.EndpointPool.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            session (aiohttp.ClientSession, optional): session used to send
+                the queries. Defaults to None, a session is opened for each
+                call to translate.
+            max_concurrent_queries (int, optional): the maximum number of
+                queries sent at the same time. Defaults to 4.
+            store (store.TranslationStore, optional): store of the
+                translations already obtained, see Translator. Defaults to
+                None.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            progress (progress.Progress, optional): follows the pages of
+                translate. Defaults to None.
+
+        """
+        self._aiohttp = _import_aiohttp()
+        super().__init__(property_wiki, languages_list, limit=limit,
+                         nb_elems_values=nb_elems_values, url=url,
+                         session=session, store=store,
+                         label_service=label_service, progress=progress)
+        self._max_concurrent_queries = max_concurrent_queries
+
+    @property
+    def max_concurrent_queries(self):
+        """Getter of max_concurrent_queries."""
+        return self._max_concurrent_queries
+
+    @max_concurrent_queries.setter
+    def max_concurrent_queries(self, max_concurrent_queries):
+        """Setter function for max_concurrent_queries.
+
+        Args:
+            max_concurrent_queries (int): the maximum number of queries sent
+                at the same time.
+
+        """
+        self._max_concurrent_queries = max_concurrent_queries
+
+    @contextlib.asynccontextmanager
+    async def _session_context(self):
+        """Give the session of the translator, or a new one."""
+        if self._session is not None:
+            yield self._session
+        else:
+            async with self._aiohttp.ClientSession() as session:
+                yield session
+
+    async def _send_query_async(self, session, query):
+        """Send a query to one of the endpoints, see Translator._send_query.
+
+        Args:
+            session (aiohttp.ClientSession): the session.
+            query (string): the SPARQL query.
+
+        Returns:
+            (int, bytes, string): the status, the content of the response and
+                the url of the endpoint which has sent it.
+
+        """
+        # The user-agent is required for WikiData (rules here:
+        # https://meta.wikimedia.org/wiki/User-Agent_policy)
+        headers = {'User-Agent': header.user_agent}
+        timeout = self._aiohttp.ClientTimeout(
+            sock_connect=self._endpoint_pool.timeout,
+            sock_read=self._endpoint_pool.timeout
+        )
+        tried_urls = []
+        while True:
+            url = self._endpoint_pool.choose(exclude=tried_urls)
+            tried_urls.append(url)
+            last_endpoint = len(tried_urls) == len(self._endpoint_pool)
+            logger.debug((url, query))
+            try:
+                async with session.get(url, params={'format': 'json',
+                                                    'query': query},
+                                       headers=headers,
+                                       timeout=timeout) as result:
+                    content = await result.read()
+                    status = result.status
+            except (self._aiohttp.ClientError, asyncio.TimeoutError):
+                self._endpoint_pool.report_failure(url)
+                if last_endpoint:
+                    raise
+                continue
+            if status >= 500 and not last_endpoint:
+                self._endpoint_pool.report_failure(url)
+                continue
+            return status, content, url
+
+    async def _request_wikidata_async(self, session, query, retry=0):
+        """Request_wikidata, asynchronous version.
+
+        Args:
+            session (aiohttp.ClientSession): the session.
+            query (string): the SPARQL query.
+            retry (int): the number of retries of the query. Defaults to 0.
+
+        Raises:
+            AssertionError: when the request fails.
+
+        Returns:
+            json: the result of the query.
+
+        """
+        logger.debug("Query sent to WikiData SPARQL endpoint.")
+        status, content, url = await self._send_query_async(session, query)
+
+        if status == 200:
+            self._endpoint_pool.report_success(url)
+            try:
+                result_json = json.loads(content)
+                if self._progress is not None:
+                    self._progress.add_bytes(len(content))
+                logger.debug("Results have been obtained.")
+            except json.JSONDecodeError:
+                logger.error("The request have work but the result is not " +
+                             "a json.")
+                raise
+        elif self._check_error_status(status, content, retry):
+            logger.warning('Waiting 60s before making the request again.')
+            await asyncio.sleep(60)
+            result_json = await self._request_wikidata_async(session, query,
+                                                             retry+1)
+
+        return result_json
+
+    async def _get_nb_entities_async(self, session):
+        """Return the number of entities to query, see _get_nb_entities.
+
+        Args:
+            session (aiohttp.ClientSession): the session.
+
+        Returns:
+            int: the number of wikidata entity with the property.
+
+        """
+        if self._id_list is not None:
+            return len(self._id_list)
+        query = self._format_count_query()
+        if query in self._nb_entities_cache:
+            return self._nb_entities_cache[query]
+        logger.info("Querying WikiData to count the number of entities.")
+        result_query = await self._request_wikidata_async(session, query)
+        nb_entities = int(self._json_to_pandas(result_query).iloc[0, 0])
+        logger.info("{} entities in the property {} have been found."
+                    .format(nb_entities, self._property_wiki))
+        self._nb_entities_cache[query] = nb_entities
+        return nb_entities
+
+    async def iter_pages(self, id_list=None):
+        """Iterate over the results of the queries.
+
+        The queries are sent concurrently, but their results are given in
+        the order of the queries.
+
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Yields:
+            (pd.DataFrame, bool): the result of the query, flag indicating
+                if the next query is for another language or not.
+
+        """
+        self._id_list = id_list
+        async with self._session_context() as session:
+            nb_entities = await self._get_nb_entities_async(session)
+            offsets = self._query_offsets(nb_entities)
+            self._register_job(self._estimate(nb_entities))
+            semaphore = asyncio.Semaphore(self._max_concurrent_queries)
+
+            async def fetch_page(language, offset):
+                """Send the query of a page and parse its result."""
+                async with semaphore:
+                    result_query = await self._request_wikidata_async(
+                        session, self._format_query(language, offset)
+                    )
+                page_df = self._parse_page(result_query, language)
+                if self._progress is not None:
+                    self._progress.page_done()
+                return page_df
+
+            logger.info('Starting the {} queries.'
+                        .format(len(offsets) * len(self._languages_list)))
+            tasks = [asyncio.ensure_future(fetch_page(language, offset))
+                     for language in self._languages_list
+                     for offset in offsets]
+            try:
+                for task_index, task in enumerate(tasks):
+                    flag_lang = (task_index + 1) % len(offsets) == 0
+                    yield await task, flag_lang
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def estimate(self, id_list=None):
+        """estimate, asynchronous version of Translator.estimate.
+
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Returns:
+            progress.Estimate: the number of entities, of pages and of bytes
+                of the results.
+
+        """
+        self._id_list = id_list
+        async with self._session_context() as session:
+            nb_entities = await self._get_nb_entities_async(session)
+        return self._estimate(nb_entities)
+
+    async def translate(self, id_list=None):
+        """translate, asynchronous version of Translator.translate.
+
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Returns:
+            pd.DataFrame: the same result as Translator.translate.
+
+        """
+        stored_df = None
+        if self._store is not None and id_list is not None:
+            stored_df, id_list = await _run_blocking(self._get_from_store,
+                                                     id_list)
+        query_results = [query_result async for query_result
+                         in self.iter_pages(id_list)]
+        return await _run_blocking(self._finish_translation, query_results,
+                                   id_list, stored_df)
+
+    def _finish_translation(self, query_results, id_list, stored_df):
+        """Merge the pages and put the result in the store.
+
+        Args:
+            query_results (list of (pd.DataFrame, bool)): the results of the
+                queries, see iter_pages.
+            id_list (list of string): the IDs queried.
+            stored_df (pd.DataFrame): the translations found in the store,
+                None if the store has not been used.
+
+        Returns:
+            pd.DataFrame: the same result as Translator.translate.
+
+        """
+        result_df = self._merge_results(query_results)
+        if self._store is None:
+            return result_df
+        self._put_in_store(result_df, id_list)
+        if stored_df is None:
+            return result_df
+        return self._combine_with_stored(stored_df, result_df)
+
+
+class AsyncSecondOrder(second_order.SecondOrder):
+    """AsyncSecondOrder class.
+
+    Same as SecondOrder, but translate is a coroutine and the properties are
+    translated concurrently.
+    """
+
+    def __init__(self, main_property_id, links_df, dict_properties,
+                 languages_list, limit=5000, all_elem=True,
+                 nb_elems_values=100, url='https://query.wikidata.org/sparql',
+                 chunksize=100000, max_concurrent_queries=4, store=None,
+                 label_service=True, spill_dir=None, progress=None):
+        """Init AsyncSecondOrder class.
+
+        Args:
+            main_property_id (int): id of the main property.
+            links_df (pd.DataFrame, string or iterable of pd.DataFrame):
+                the links between the different ontologies, see SecondOrder.
+            dict_properties (dict): Dictionnary of the links between the name
+                of the external ontologies and the corresponding proporties in
+                WikiData. Format: 'ontology_name': 'wikidata_id'.
+            languages_list (list): list of all the languages we want a
+                translation.
+            limit (int, optional): the number of elements returned in one
+                query. Defaults to 5000.
+            all_elem (bool, optional): a flag, True if extracts all the label
+                of the main property, False is the extraction is only for the
+                IDs in the links_df DataFrame. Defauts to True.
+            nb_elems_values (int, optional): number of elements put in VALUES,
+                small number to avoid error 414.
+            url (str, optional): url to wikidata or to a local sparql endpoint
+                of wikidata, a list of urls or an endpoints.EndpointPool.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            chunksize (int, optional): the number of rows of a chunk when
+                links_df is a file. Defaults to 100000.
+            max_concurrent_queries (int, optional): the maximum number of
+                queries sent at the same time by each property. Defaults to 4.
+            store (store.TranslationStore, optional): store of the
+                translations already obtained, see SecondOrder. Defaults to
+                None.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            spill_dir (string, optional): directory where the rows of the
+                result are written while they are assembled, see
+                SecondOrder. Defaults to None.
+            progress (progress.Progress, optional): follows the pages of
+                all the properties. Defaults to None.
+
+        """
+        self._aiohttp = _import_aiohttp()
+        super().__init__(main_property_id, links_df, dict_properties,
+                         languages_list, limit=limit, all_elem=all_elem,
+                         nb_elems_values=nb_elems_values, url=url,
+                         chunksize=chunksize, store=store,
+                         label_service=label_service, spill_dir=spill_dir,
+                         progress=progress)
+        self._max_concurrent_queries = max_concurrent_queries
+        self._session = None
+
+    def _make_translator(self, prop):
+        """Create the asynchronous translator of a property.
+
+        Args:
+            prop (string): A WikiData property.
+
+        Returns:
+            AsyncTranslator: the translator of the property.
+
+        """
+        translator = AsyncTranslator(
+            prop, self._languages_list, limit=self._limit,
+            nb_elems_values=self._nb_elems_values, url=self._endpoint_pool,
+            session=self._session,
+            max_concurrent_queries=self._max_concurrent_queries,
+            store=self._store, label_service=self._label_service,
+            progress=self._progress
+        )
+        return self._share_state(translator, prop)
+
+    async def _get_translations_async(self, prop, is_main=False):
+        """Get the translations of a given property, asynchronous version.
+
+        Args:
+            prop (string): A WikiData property.
+            is_main (bool): a flag to say whether the property is the main one
+                or not.
+
+        Returns:
+            pd.DataFrame: a DataFrame with the translations of the elements of
+                the property.
+
+        """
+        translator = self._make_translator(prop)
+        return await translator.translate(self._get_id_list(prop, is_main))
+
+    async def _estimates_async(self):
+        """Estimate the size of the translations of each property.
+
+        Returns:
+            dict: property -> progress.Estimate, see SecondOrder._estimates.
+
+        """
+        # The links are read once, before the queries
+        await _run_blocking(self._get_id_sets)
+        properties = [prop for prop, _ in self._iter_properties()]
+        estimates = await asyncio.gather(*[
+            self._make_translator(prop).estimate(
+                self._get_id_list(prop, is_main)
+            ) for prop, is_main in self._iter_properties()
+        ])
+        return dict(zip(properties, estimates))
+
+    async def estimate(self):
+        """estimate, asynchronous version of SecondOrder.estimate.
+
+        Returns:
+            progress.Estimate: the number of entities, of pages and of bytes
+                of all the properties.
+
+        """
+        async with self._aiohttp.ClientSession() as session:
+            self._session = session
+            try:
+                estimates = await self._estimates_async()
+            finally:
+                self._session = None
+        return progress.add_estimates(estimates.values())
+
+    async def translate(self):
+        """translate, asynchronous version of SecondOrder.translate.
+
+        Returns:
+            pd.DataFrame: the same result as SecondOrder.translate.
+
+        """
+        async with self._aiohttp.ClientSession() as session:
+            self._session = session
+            try:
+                await _run_blocking(self._get_id_sets)
+                if self._progress is not None:
+                    self._register_estimates(await self._estimates_async())
+                translations_list = await asyncio.gather(
+                    self._get_translations_async(self._main_property_id,
+                                                 True),
+                    *[self._get_translations_async(property_id)
+                      for property_id in self._dict_properties]
+                )
+            finally:
+                self._session = None
+        logger.info('Translations of all the properties obtained')
+        return await _run_blocking(self._assemble, translations_list[0],
+                                   list(zip(self._dict_properties.values(),
+                                            translations_list[1:])))
@@ -0,0 +1,462 @@
+"""Batch extraction.
+
+Allows to run the extraction of several properties at once, sharing the
+connections, the cache of the queries and a single pool of workers with a
+global limit on the number of concurrent queries and on the rate of the
+queries.
+"""
+import collections
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from wikidata_property_extraction import endpoints, progress, translation
+from wikidata_property_extraction.lazy_import import LazyModule
+
+requests = LazyModule('requests')
+
+logger = logging.getLogger(__name__)
+
+Job = collections.namedtuple('Job', ['property_wiki', 'languages_list',
+                                     'id_list'])
+Job.__new__.__defaults__ = (None,)
+Job.__doc__ = """A job of a batch: a property, a list of languages and an
+optional list of IDs, as in Translator."""
+
+# The public endpoint of WikiData allows 5 queries at the same time per IP
+DEFAULT_MAX_REQUESTS_PER_SECOND = 5
+
+
+class RateLimiter():
+    """Rate limiter shared between threads.
+
+    Spaces the queries to send at most max_requests_per_second queries per
+    second, and stops all the queries for a while when the endpoint answers
+    that there are too many requests.
+    """
+
+    def __init__(self, max_requests_per_second=None):
+        """Init the rate limiter.
+
+        Args:
+            max_requests_per_second (float, optional): the maximum number of
+                queries sent per second. Defaults to None, no limit.
+
+        """
+        self._max_requests_per_second = max_requests_per_second
+        self._lock = threading.Lock()
+        self._next_time = 0.
+
+    def wait(self):
+        """Block until a new query can be sent."""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            if self._max_requests_per_second:
+                self._next_time = max(now, self._next_time) \
+                    + 1. / self._max_requests_per_second
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def pause(self, wait_time):
+        """Delay the next queries of all the threads.
+
+        Args:
+            wait_time (float): the number of seconds without any query.
+
+        """
+        with self._lock:
+            self._next_time = max(self._next_time,
+                                  time.monotonic() + wait_time)
+
+
+class BatchTranslator():
+    """BatchTranslator class.
+
+    Take a list of jobs and run all their queries through a single pool of
+    workers. The queries of all the jobs are scheduled together, so the
+    throughput depends on the number of workers and not on the serial loop
+    of each job.
+    """
+
+    def __init__(self, jobs, max_workers=4,
+                 max_requests_per_second=DEFAULT_MAX_REQUESTS_PER_SECOND,
+                 limit=5000, nb_elems_values=200,
+                 url='https://query.wikidata.org/sparql', cache_dir=None,
+                 store=None, label_service=True, progress=None,
+                 memory_cache=False):
+        """Init BatchTranslator class.
+
+        Args:
+            jobs (list of Job): the jobs to run. A tuple (property_wiki,
+                languages_list[, id_list]) is also accepted.
+            max_workers (int, optional): the maximum number of queries
+                running at the same time for all the jobs. Defaults to 4.
+            max_requests_per_second (float, optional): the maximum number of
+                queries sent per second for all the jobs, None for no limit.
+                After an error 429, all the workers wait before sending new
+                queries. Defaults to DEFAULT_MAX_REQUESTS_PER_SECOND.
+            limit (int, optional): the number of elements returned in one
+                query, see Translator. Defaults to 5000.
+            nb_elems_values (int, optional): number of elements put in VALUES,
+                see Translator. Defaults to 200.
+            url (str, optional): url to wikidata or to a local sparql endpoint
+                of wikidata. A list of urls or an endpoints.EndpointPool
+                spreads the queries of all the jobs on several endpoints.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            cache_dir (string, optional): directory where the results of the
+                queries are cached. A batch run again with the same
+                cache_dir only sends the queries which have not been done
+                yet. Defaults to None, only the results of the count queries
+                are kept, in memory (see memory_cache).
+            store (store.TranslationStore, optional): store of the
+                translations shared by the jobs. Only the IDs of a job which
+                are not in the store are queried. Defaults to None.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            progress (progress.Progress, optional): follows the pages of all
+                the jobs. Defaults to None.
+            memory_cache (bool, optional): without cache_dir, keep the
+                results of the pages in memory for the duration of the
+                batch too, so the identical queries of different jobs are
+                sent once. Defaults to False, the memory holds about as much
+                as the results again.
+
+        """
+        self._jobs = [Job(*job) for job in jobs]
+        self._max_workers = max_workers
+        self._rate_limiter = RateLimiter(max_requests_per_second)
+        self._limit = limit
+        self._nb_elems_values = nb_elems_values
+        self._endpoint_pool = endpoints.endpoint_pool(url)
+        self._session = requests.Session()
+        self._cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._memory_cache = memory_cache
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._store = store
+        self._label_service = label_service
+        self._progress = progress
+
+    @property
+    def jobs(self):
+        """Getter of jobs."""
+        return self._jobs
+
+    @property
+    def progress(self):
+        """Getter of progress."""
+        return self._progress
+
+    def _make_translator(self, job):
+        """Create the Translator of a job, sharing the session of the batch.
+
+        Args:
+            job (Job): the job.
+
+        Returns:
+            Translator: the translator of the job.
+
+        """
+        translator = translation.Translator(
+            job.property_wiki, job.languages_list, limit=self._limit,
+            nb_elems_values=self._nb_elems_values, url=self._endpoint_pool,
+            session=self._session, store=self._store,
+            label_service=self._label_service, progress=self._progress
+        )
+        # pylint: disable=protected-access
+        translator._id_list = job.id_list
+        translator._rate_limiter = self._rate_limiter
+        return translator
+
+    def _cache_path(self, query):
+        """Return the path of the cached result of a query.
+
+        Args:
+            query (string): the SPARQL query.
+
+        Returns:
+            string: the path of the file in cache_dir.
+
+        """
+        query_hash = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, query_hash + '.json')
+
+    def _read_cache(self, query):
+        """Read the result of a query from the cache.
+
+        Args:
+            query (string): the SPARQL query.
+
+        Returns:
+            json: the result of the query, None if it is not in the cache.
+
+        """
+        if self._cache_dir is None:
+            with self._cache_lock:
+                return self._cache.get(query)
+        try:
+            with open(self._cache_path(query), 'r', encoding='utf-8') \
+                    as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+
+    def _write_cache(self, query, result_json, is_count=False):
+        """Write the result of a query in the cache.
+
+        Args:
+            query (string): the SPARQL query.
+            result_json (json): the result of the query.
+            is_count (bool, optional): whether the query is a count query,
+                always kept in memory without cache_dir. Defaults to False.
+
+        """
+        if self._cache_dir is None:
+            if is_count or self._memory_cache:
+                with self._cache_lock:
+                    self._cache[query] = result_json
+            return
+        cache_path = self._cache_path(query)
+        # Written in a temporary file first, an interrupted batch never
+        # leaves a partial result in the cache
+        tmp_path = '{}.{}.tmp'.format(cache_path, threading.get_ident())
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(result_json, cache_file)
+        os.replace(tmp_path, cache_path)
+
+    def _request(self, translator, query, is_count=False):
+        """Send a query, or get its result from the cache of the batch.
+
+        Args:
+            translator (Translator): the translator sending the query.
+            query (string): the SPARQL query.
+            is_count (bool, optional): whether the query is a count query.
+                Defaults to False.
+
+        Returns:
+            json: the result of the query.
+
+        """
+        result_json = self._read_cache(query)
+        if result_json is not None:
+            return result_json
+        self._rate_limiter.wait()
+        # pylint: disable=protected-access
+        result_json = translator._request_wikidata(query)
+        self._write_cache(query, result_json, is_count)
+        return result_json
+
+    def _count(self, translator):
+        """Return the query offsets of a job.
+
+        With a store, only the IDs which are not in the store are queried.
+
+        Args:
+            translator (Translator): the translator of the job.
+
+        Returns:
+            (list of int, pd.DataFrame): the offset of each query of one
+                language, and the translations found in the store (None
+                without store).
+
+        """
+        # pylint: disable=protected-access
+        stored_df = None
+        if self._store is not None and translator._id_list is not None:
+            stored_df, translator._id_list = \
+                translator._get_from_store(translator._id_list)
+        nb_entities = self._nb_entities(translator)
+        if self._progress is not None:
+            self._progress.add_job(translator._estimate(nb_entities))
+        return translator._query_offsets(nb_entities), stored_df
+
+    def _nb_entities(self, translator):
+        """Return the number of entities of a job.
+
+        Args:
+            translator (Translator): the translator of the job.
+
+        Returns:
+            int: the number of entities to query.
+
+        """
+        # pylint: disable=protected-access
+        if translator._id_list is not None:
+            return len(translator._id_list)
+        result_query = self._request(translator,
+                                     translator._format_count_query(),
+                                     is_count=True)
+        nb_entities_df = translator._json_to_pandas(result_query)
+        return int(nb_entities_df.iloc[0, 0])
+
+    def estimate(self):
+        """Estimate the size of the jobs before running them.
+
+        The count queries are sent, their results are kept in the cache of
+        the batch. The IDs in the store are not taken into account.
+
+        Returns:
+            progress.Estimate: the number of entities, of pages and of bytes
+                of all the jobs.
+
+        """
+        estimates = []
+        for job in self._jobs:
+            translator = self._make_translator(job)
+            # pylint: disable=protected-access
+            estimates.append(translator._estimate(
+                self._nb_entities(translator)
+            ))
+        return progress.add_estimates(estimates)
+
+    def _page(self, translator, language, offset):
+        """Run one query of a job.
+
+        Args:
+            translator (Translator): the translator of the job.
+            language (string): the language of the query.
+            offset (int): the offset of the query.
+
+        Returns:
+            pd.DataFrame: the result of the query.
+
+        """
+        # pylint: disable=protected-access
+        query = translator._format_query(language, offset)
+        page_df = translator._parse_page(self._request(translator, query),
+                                         language)
+        if self._progress is not None:
+            self._progress.page_done()
+        return page_df
+
+    def iter_results(self):
+        """Run the jobs and yield their results as soon as they are done.
+
+        Yields:
+            (Job, pd.DataFrame): the job and its result, with the same format
+                as the result of Translator.translate.
+
+        """
+        for job_index, result_df in self._iter_indexed_results():
+            yield self._jobs[job_index], result_df
+
+    def _iter_indexed_results(self):
+        """Run the jobs and yield their results as soon as they are done.
+
+        Yields:
+            (int, pd.DataFrame): the index of the job and its result.
+
+        """
+        translators = [self._make_translator(job) for job in self._jobs]
+        pages = {}
+        stored = {}
+        nb_remaining = {}
+        with concurrent.futures.ThreadPoolExecutor(self._max_workers) \
+                as executor:
+            futures = {executor.submit(self._count, translator):
+                       (job_index, None)
+                       for job_index, translator in enumerate(translators)}
+            try:
+                while futures:
+                    done, _ = concurrent.futures.wait(
+                        futures,
+                        return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        job_index, page_key = futures.pop(future)
+                        translator = translators[job_index]
+                        result = future.result()
+                        if page_key is None:
+                            # Counting done, schedule the queries of the job
+                            offsets, stored[job_index] = result
+                            page_keys = [(language, offset) for language
+                                         in translator.languages_list
+                                         for offset in offsets]
+                            pages[job_index] = dict.fromkeys(page_keys)
+                            nb_remaining[job_index] = len(page_keys)
+                            logger.info('Scheduling {} queries for the job {}.'
+                                        .format(len(page_keys),
+                                                self._jobs[job_index]))
+                            for key in page_keys:
+                                future = executor.submit(self._page,
+                                                         translator, *key)
+                                futures[future] = (job_index, key)
+                        else:
+                            pages[job_index][page_key] = result
+                            nb_remaining[job_index] -= 1
+                        if nb_remaining[job_index] == 0:
+                            result_df = self._assemble(translator,
+                                                       pages.pop(job_index))
+                            yield job_index, self._store_result(
+                                translator, result_df, stored.pop(job_index)
+                            )
+            except BaseException:
+                # On an error or when the iteration is stopped, the queued
+                # queries are not sent
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _store_result(self, translator, result_df, stored_df):
+        """Put the result of a job in the store and add the stored part.
+
+        Args:
+            translator (Translator): the translator of the job.
+            result_df (pd.DataFrame): the result of the queries of the job.
+            stored_df (pd.DataFrame): the translations found in the store,
+                None if the store has not been used.
+
+        Returns:
+            pd.DataFrame: the result of the job.
+
+        """
+        if self._store is None:
+            return result_df
+        # pylint: disable=protected-access
+        translator._put_in_store(result_df, translator._id_list)
+        if stored_df is None:
+            return result_df
+        return translator._combine_with_stored(stored_df, result_df)
+
+    @staticmethod
+    def _assemble(translator, job_pages):
+        """Assemble the pages of a job as Translator.translate does.
+
+        Args:
+            translator (Translator): the translator of the job.
+            job_pages (dict): (language, offset) -> pd.DataFrame, in the
+                order of the queries.
+
+        Returns:
+            pd.DataFrame: the result of the job.
+
+        """
+        query_results = []
+        for language in translator.languages_list:
+            language_pages = [page_df for (page_language, _), page_df
+                              in job_pages.items()
+                              if page_language == language]
+            query_results += [
+                (page_df, page_index + 1 == len(language_pages))
+                for page_index, page_df in enumerate(language_pages)
+            ]
+        # pylint: disable=protected-access
+        return translator._merge_results(query_results)
+
+    def run(self):
+        """Run all the jobs.
+
+        Returns:
+            list of pd.DataFrame: the result of each job, in the order of
+                jobs.
+
+        """
+        results = dict(self._iter_indexed_results())
+        return [results[job_index] for job_index in range(len(self._jobs))]
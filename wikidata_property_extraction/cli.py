@@ -0,0 +1,360 @@
+"""Command-line interface.
+
+wikidata-extract runs the jobs of a job file and writes the result of each
+job in its own file as soon as the job is done.
+
+Example of job file (JSON), the paths are relative to the job file:
+
+    {
+        "user_agent": "MyExtraction/0.1 (me@example.org)",
+        "endpoints": ["https://query.wikidata.org/sparql"],
+        "limit": 5000,
+        "nb_elems_values": 200,
+        "label_service": true,
+        "jobs": [
+            {"name": "doid", "property": "P699", "languages": ["fr", "es"]},
+            {"name": "departments", "property": "P2586",
+             "languages": ["fr"], "id_list": ["01", "02"]},
+            {"name": "orphanet_ids", "property": "P1550",
+             "languages": ["fr"], "id_file": "orphanet_ids.txt"},
+            {"name": "doid_second", "property": "P699", "languages": ["fr"],
+             "links_file": "links.csv", "properties": {"P486": "MeSH"},
+             "all_elem": false}
+        ]
+    }
+
+A job with a links_file is a second order extraction (see SecondOrder), the
+links file is a CSV, TSV, JSON lines, JSON or Parquet file with the columns
+value_property, id_auxiliary and name_auxiliary, read by chunks. "endpoints"
+can also be a list of {"url": ..., "weight": ...}. With "label_service": false,
+the labels are read without the wikibase:label service, for the endpoints
+which do not have it.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+from wikidata_property_extraction import batch, endpoints, header, \
+    progress, second_order, store
+from wikidata_property_extraction.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ['csv', 'jsonl', 'parquet']
+
+
+def write_result(result_df, path, output_format):
+    """Write the result of a job.
+
+    The result is written in a temporary file renamed at the end, so a file
+    with the final name is always complete.
+
+    Args:
+        result_df (pd.DataFrame): the result.
+        path (string): the path of the output file.
+        output_format (string): 'csv', 'jsonl' or 'parquet'.
+
+    """
+    tmp_path = path + '.tmp'
+    if output_format == 'csv':
+        result_df.to_csv(tmp_path, index=False)
+    elif output_format == 'jsonl':
+        result_df.to_json(tmp_path, orient='records', lines=True,
+                          force_ascii=False)
+    elif output_format == 'parquet':
+        result_df.to_parquet(tmp_path, index=False)
+    else:
+        err_msg = f'Unknown output format {output_format}, use one of '\
+            + f'{OUTPUT_FORMATS}.'
+        logger.error(err_msg)
+        raise ValueError(err_msg)
+    os.replace(tmp_path, path)
+
+
+def log_progress(progress_state):
+    """Log the progress of the jobs.
+
+    Args:
+        progress_state (progress.ProgressState): the state of the progress.
+
+    """
+    eta = 'unknown' if progress_state.eta is None \
+        else '{:.0f}s'.format(progress_state.eta)
+    logger.info('{}/{} queries done ({:.1f} MB of about {:.1f} MB), '
+                'remaining time: {}.'
+                .format(progress_state.nb_pages_done, progress_state.nb_pages,
+                        progress_state.nb_bytes_done / 1e6,
+                        progress_state.nb_bytes / 1e6, eta))
+
+
+def _make_endpoint_pool(endpoints_spec):
+    """Create the endpoint pool of a job file.
+
+    Args:
+        endpoints_spec (string or list): a url, a list of urls or a list of
+            {"url": ..., "weight": ...}.
+
+    Returns:
+        endpoints.EndpointPool: the pool.
+
+    """
+    if isinstance(endpoints_spec, str):
+        endpoints_spec = [endpoints_spec]
+    urls = []
+    weights = []
+    for endpoint in endpoints_spec:
+        if isinstance(endpoint, dict):
+            urls.append(endpoint['url'])
+            weights.append(endpoint.get('weight', 1))
+        else:
+            urls.append(endpoint)
+            weights.append(1)
+    return endpoints.EndpointPool(urls, weights)
+
+
+def _read_id_list(job_spec, base_dir):
+    """Read the list of IDs of a job.
+
+    Args:
+        job_spec (dict): the job.
+        base_dir (string): the directory of the job file.
+
+    Returns:
+        list of string: the IDs, None to translate all the entities.
+
+    """
+    if 'id_list' in job_spec:
+        return [str(current_id) for current_id in job_spec['id_list']]
+    if 'id_file' in job_spec:
+        with open(os.path.join(base_dir, job_spec['id_file']), 'r',
+                  encoding='utf-8') as id_file:
+            return [line.strip() for line in id_file if line.strip()]
+    return None
+
+
+def run_jobs(spec, base_dir, output_dir, output_format='csv', max_workers=4,
+             max_requests_per_second=batch.DEFAULT_MAX_REQUESTS_PER_SECOND,
+             cache_dir=None, overwrite=False, store_path=None):
+    """Run the jobs of a job file.
+
+    Args:
+        spec (dict): the content of the job file.
+        base_dir (string): the directory of the job file.
+        output_dir (string): the directory of the output files.
+        output_format (string, optional): 'csv', 'jsonl' or 'parquet'.
+            Defaults to 'csv'.
+        max_workers (int, optional): the maximum number of queries running at
+            the same time. Defaults to 4.
+        max_requests_per_second (float, optional): the maximum number of
+            queries per second, None for no limit. Defaults to
+            batch.DEFAULT_MAX_REQUESTS_PER_SECOND.
+        cache_dir (string, optional): directory of the cache of the queries,
+            see BatchTranslator. Defaults to None.
+        overwrite (bool, optional): run again the jobs whose output file
+            already exists. Defaults to False.
+        store_path (string, optional): path of the SQLite translation store,
+            see store.TranslationStore. Defaults to None, no store.
+
+    Returns:
+        list of string: the paths of the output files written.
+
+    """
+    endpoint_pool = _make_endpoint_pool(
+        spec.get('endpoints', 'https://query.wikidata.org/sparql')
+    )
+    limit = spec.get('limit', 5000)
+    nb_elems_values = spec.get('nb_elems_values', 200)
+    label_service = spec.get('label_service', True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Each job of the file gives one or several jobs of the batch
+    batch_jobs = []
+    batch_owners = []
+    pending = {}
+    for job_index, job_spec in enumerate(spec['jobs']):
+        name = job_spec.get('name',
+                            '{}_{}'.format(job_spec['property'], job_index))
+        path = os.path.join(output_dir, '{}.{}'.format(name, output_format))
+        if os.path.exists(path) and not overwrite:
+            logger.info('{} already exists, job {} skipped.'
+                        .format(path, name))
+            continue
+        languages_list = job_spec['languages']
+        if 'links_file' in job_spec:
+            # The links file is read by chunks by SecondOrder
+            translator = second_order.SecondOrder(
+                job_spec['property'],
+                os.path.join(base_dir, job_spec['links_file']),
+                job_spec['properties'], languages_list,
+                all_elem=job_spec.get('all_elem', True)
+            )
+            properties = [job_spec['property']] + \
+                list(job_spec['properties'])
+            # pylint: disable=protected-access
+            sub_jobs = [batch.Job(prop, languages_list,
+                                  translator._get_id_list(prop, is_main))
+                        for prop, is_main
+                        in zip(properties, [True] + [False] * len(properties))]
+        else:
+            translator = None
+            sub_jobs = [batch.Job(job_spec['property'], languages_list,
+                                  _read_id_list(job_spec, base_dir))]
+        pending[job_index] = {'name': name, 'path': path,
+                              'translator': translator,
+                              'results': [None] * len(sub_jobs),
+                              'nb_remaining': len(sub_jobs)}
+        for sub_index, sub_job in enumerate(sub_jobs):
+            batch_jobs.append(sub_job)
+            batch_owners.append((job_index, sub_index))
+
+    translation_store = None
+    if store_path is not None:
+        translation_store = store.TranslationStore(store_path)
+    batch_translator = batch.BatchTranslator(
+        batch_jobs, max_workers=max_workers,
+        max_requests_per_second=max_requests_per_second, limit=limit,
+        nb_elems_values=nb_elems_values, url=endpoint_pool,
+        cache_dir=cache_dir, store=translation_store,
+        label_service=label_service, progress=progress.Progress()
+    )
+    try:
+        return _write_results(batch_translator, batch_owners, pending,
+                              output_format)
+    finally:
+        if translation_store is not None:
+            translation_store.close()
+
+
+def _write_results(batch_translator, batch_owners, pending, output_format):
+    """Run a batch and write the result of each job when it is done.
+
+    Args:
+        batch_translator (batch.BatchTranslator): the batch of all the jobs.
+        batch_owners (list of (int, int)): the job of the job file and the
+            position in this job of each job of the batch.
+        pending (dict): the jobs of the job file which are not done.
+        output_format (string): 'csv', 'jsonl' or 'parquet'.
+
+    Returns:
+        list of string: the paths of the output files written.
+
+    """
+    written_paths = []
+    # pylint: disable=protected-access
+    for batch_index, result_df in batch_translator._iter_indexed_results():
+        job_index, sub_index = batch_owners[batch_index]
+        job = pending[job_index]
+        job['results'][sub_index] = result_df
+        job['nb_remaining'] -= 1
+        if job['nb_remaining'] > 0:
+            continue
+        if job['translator'] is None:
+            result_df = job['results'][0]
+        else:
+            result_df = job['translator']._assemble(
+                job['results'][0],
+                zip(job['translator'].dict_properties.values(),
+                    job['results'][1:])
+            )
+        write_result(result_df, job['path'], output_format)
+        logger.info('Job {} done, {} rows written in {}.'
+                    .format(job['name'], len(result_df), job['path']))
+        log_progress(batch_translator.progress.state())
+        written_paths.append(job['path'])
+        del pending[job_index]
+    return written_paths
+
+
+def parse_args(argv=None):
+    """Parse the arguments of the command line.
+
+    Args:
+        argv (list of string, optional): the arguments. Defaults to None, the
+            arguments of the command line.
+
+    Returns:
+        argparse.Namespace: the parsed arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='wikidata-extract',
+        description='Extract the labels of WikiData properties.'
+    )
+    parser.add_argument('job_file', help='JSON file describing the jobs.')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='directory of the output files.')
+    parser.add_argument('-f', '--format', default='csv',
+                        choices=OUTPUT_FORMATS, help='format of the output.')
+    parser.add_argument('-w', '--max-workers', type=int, default=4,
+                        help='maximum number of concurrent queries.')
+    parser.add_argument('-r', '--max-requests-per-second', type=float,
+                        default=batch.DEFAULT_MAX_REQUESTS_PER_SECOND,
+                        help='maximum number of queries per second, 0 for no '
+                        + 'limit.')
+    parser.add_argument('-c', '--cache-dir', default=None,
+                        help='directory of the cache of the queries, an '
+                        + 'interrupted run started again with the same cache '
+                        + 'only sends the missing queries.')
+    parser.add_argument('-e', '--endpoint', action='append', default=None,
+                        help='url of a SPARQL endpoint, can be repeated. '
+                        + 'Overrides the endpoints of the job file.')
+    parser.add_argument('--no-label-service', action='store_true',
+                        help='read the labels without the wikibase:label '
+                        + 'service, for the endpoints which do not have it.')
+    parser.add_argument('-u', '--user-agent', default=None,
+                        help='User-Agent, overrides the one of the job '
+                        + 'file.')
+    parser.add_argument('-s', '--store', default=None,
+                        help='SQLite file storing the translations between '
+                        + 'the runs, the IDs already stored are not queried '
+                        + 'again.')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='run again the jobs whose output file exists.')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show the debug logs.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Entry point of wikidata-extract.
+
+    Args:
+        argv (list of string, optional): the arguments. Defaults to None, the
+            arguments of the command line.
+
+    Returns:
+        int: the exit code.
+
+    """
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose
+                        else logging.INFO)
+
+    with open(args.job_file, 'r', encoding='utf-8') as job_file:
+        spec = json.load(job_file)
+    if args.endpoint:
+        spec['endpoints'] = args.endpoint
+    if args.no_label_service:
+        spec['label_service'] = False
+    user_agent = args.user_agent or spec.get('user_agent')
+    if user_agent is None:
+        logger.error('A User-Agent is needed, use --user-agent or set '
+                     + 'user_agent in the job file.')
+        return 2
+    header.initialize_user_agent(user_agent)
+
+    run_jobs(spec, os.path.dirname(os.path.abspath(args.job_file)),
+             args.output_dir, output_format=args.format,
+             max_workers=args.max_workers,
+             max_requests_per_second=args.max_requests_per_second,
+             cache_dir=args.cache_dir, overwrite=args.overwrite,
+             store_path=args.store)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Endpoints.
+
+Allows to use several SPARQL endpoints (for example replicas of a local
+mirror of WikiData) for the same extraction. The queries are spread on the
+endpoints according to their weights, and an endpoint failing (not reachable,
+answering with a server error or not answering within the timeout) is put
+aside for some time while the queries fail over to the other ones.
+"""
+import logging
+import threading
+import time
+
+from wikidata_property_extraction import header
+from wikidata_property_extraction.lazy_import import LazyModule
+
+requests = LazyModule('requests')
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_QUERY = 'ASK {}'
+
+# WikiData stops the queries after 60 seconds, an endpoint silent for longer
+# is considered as failed
+DEFAULT_TIMEOUT = 90
+
+
+class EndpointPool():
+    """EndpointPool class.
+
+    A list of SPARQL endpoints with weights. Each call to choose returns the
+    next endpoint with a smooth weighted round-robin over the healthy
+    endpoints.
+    """
+
+    def __init__(self, urls, weights=None, cooldown=60,
+                 timeout=DEFAULT_TIMEOUT):
+        """Init EndpointPool class.
+
+        Args:
+            urls (list of string): the urls of the SPARQL endpoints.
+            weights (list of int, optional): the weight of each endpoint, an
+                endpoint with a weight of 2 receives twice more queries than
+                an endpoint with a weight of 1. Defaults to None, the same
+                weight for all the endpoints.
+            cooldown (float, optional): the number of seconds an endpoint is
+                put aside after a failure. Defaults to 60.
+            timeout (float, optional): the number of seconds to wait for an
+                endpoint to accept the connection, and then between two
+                parts of its answer. An endpoint which does not answer in
+                time has failed. Defaults to DEFAULT_TIMEOUT.
+
+        """
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            err_msg = 'At least one endpoint url is needed.'
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+        if weights is None:
+            weights = [1] * len(urls)
+        if len(weights) != len(urls):
+            err_msg = 'The number of weights and of urls are different.'
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+        self._urls = list(urls)
+        self._weights = dict(zip(self._urls, weights))
+        self._cooldown = cooldown
+        self._timeout = timeout
+        self._current_weights = dict.fromkeys(self._urls, 0)
+        self._down_until = dict.fromkeys(self._urls, 0.)
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self):
+        """Getter of urls."""
+        return self._urls
+
+    @property
+    def timeout(self):
+        """Getter of timeout."""
+        return self._timeout
+
+    @property
+    def weights(self):
+        """Getter of weights."""
+        return [self._weights[url] for url in self._urls]
+
+    def __len__(self):
+        """Return the number of endpoints."""
+        return len(self._urls)
+
+    def is_healthy(self, url):
+        """Return whether an endpoint is healthy.
+
+        Args:
+            url (string): the url of the endpoint.
+
+        Returns:
+            bool: False if the endpoint has failed less than cooldown
+                seconds ago.
+
+        """
+        return self._down_until[url] <= time.monotonic()
+
+    def choose(self, exclude=()):
+        """Choose the endpoint of the next query.
+
+        Args:
+            exclude (list of string, optional): urls not to choose, for
+                example the endpoints which have already failed for the
+                query. Defaults to ().
+
+        Returns:
+            string: the url of the endpoint, None if all are excluded.
+
+        """
+        with self._lock:
+            candidates = [url for url in self._urls if url not in exclude]
+            healthy = [url for url in candidates if self.is_healthy(url)]
+            # If all the endpoints are down, try them anyway
+            candidates = healthy or candidates
+            if not candidates:
+                return None
+            total_weight = 0
+            for url in candidates:
+                self._current_weights[url] += self._weights[url]
+                total_weight += self._weights[url]
+            chosen_url = max(candidates,
+                             key=lambda url: self._current_weights[url])
+            self._current_weights[chosen_url] -= total_weight
+            return chosen_url
+
+    def report_failure(self, url):
+        """Put an endpoint aside after a failure.
+
+        Args:
+            url (string): the url of the endpoint.
+
+        """
+        logger.warning('The endpoint {} has failed, not used for {}s.'
+                       .format(url, self._cooldown))
+        with self._lock:
+            self._down_until[url] = time.monotonic() + self._cooldown
+
+    def report_success(self, url):
+        """Mark an endpoint as healthy after a success.
+
+        Args:
+            url (string): the url of the endpoint.
+
+        """
+        with self._lock:
+            self._down_until[url] = 0.
+
+    def check_health(self, timeout=10):
+        """Send a small query to each endpoint and update their health.
+
+        Args:
+            timeout (float, optional): timeout of the query in seconds.
+                Defaults to 10.
+
+        Returns:
+            dict: url -> bool, True if the endpoint has answered.
+
+        """
+        health = {}
+        for url in self._urls:
+            try:
+                result = requests.get(
+                    url, params={'format': 'json',
+                                 'query': HEALTH_CHECK_QUERY},
+                    headers={'User-Agent': header.user_agent},
+                    timeout=timeout
+                )
+                health[url] = result.status_code == 200
+            except requests.RequestException:
+                health[url] = False
+            if health[url]:
+                self.report_success(url)
+            else:
+                self.report_failure(url)
+        return health
+
+
+def endpoint_pool(url):
+    """Return the endpoint pool of a url.
+
+    Args:
+        url (string, list of string or EndpointPool): a url, a list of urls
+            or an EndpointPool.
+
+    Returns:
+        EndpointPool: the pool, url itself if it is already an EndpointPool.
+
+    """
+    if isinstance(url, EndpointPool):
+        return url
+    return EndpointPool(url)
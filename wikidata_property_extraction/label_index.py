@@ -0,0 +1,299 @@
+"""Label index.
+
+Inverted index from the labels and alternative labels of the translations
+to the values of the property, to find which value_property a term of a given
+language refers to without scanning the translations.
+
+The index is written in a single file, opened with mmap, so it can be shared
+between processes and only the pages needed by the lookups are read.
+
+File format (integers are little-endian):
+    - the magic bytes b'WPELIDX1',
+    - the size of the header (uint32) and the header as JSON,
+    - the offsets of the records (nb_keys + 1 uint64),
+    - the records, sorted by key: language, \\x00, normalized label, \\x00,
+      the values separated by \\x1f.
+"""
+import bisect
+import json
+import logging
+import mmap
+import re
+import struct
+import unicodedata
+
+from wikidata_property_extraction import postprocess
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WPELIDX1'
+KEY_SEPARATOR = b'\x00'
+VALUE_SEPARATOR = b'\x1f'
+SPACES_REGEX = re.compile(r'[\s\x00\x1f]+')
+
+
+def normalize_label(label):
+    """Normalize a label for the index.
+
+    Args:
+        label (string): a label.
+
+    Returns:
+        string: the label in NFKC form, case folded, with the whitespaces
+            collapsed.
+
+    """
+    label = unicodedata.normalize('NFKC', label).casefold()
+    return SPACES_REGEX.sub(' ', label).strip()
+
+
+def _label_columns(translations_df):
+    """List the columns of labels and their language.
+
+    Args:
+        translations_df (pd.DataFrame): the translations.
+
+    Returns:
+        list of (string, string): the name of the column and its language.
+
+    """
+    label_columns = []
+    for column in translations_df.columns:
+        for prefix in ['label', 'alt']:
+            if column.startswith(prefix) and len(column) > len(prefix):
+                label_columns.append((column, column[len(prefix):].lower()))
+    return label_columns
+
+
+def build_label_index(translations_df, path):
+    """Build the label index of translations and write it in a file.
+
+    Args:
+        translations_df (pd.DataFrame): the result of
+            postprocess.translations_only, or of the translate method of
+            Translator or SecondOrder, with the column value_property.
+        path (string): the path of the index file.
+
+    Returns:
+        LabelIndex: the index, opened.
+
+    """
+    if 'value_property' in translations_df.columns:
+        values = translations_df['value_property']
+    else:
+        values = translations_df.index.to_series()
+    values = values.astype(str).tolist()
+
+    index_dict = {}
+    label_columns = _label_columns(translations_df)
+    for column, language in label_columns:
+        for value, labels in zip(values, translations_df[column].tolist()):
+            if not isinstance(labels, str):
+                continue
+            for label in labels.split('|'):
+                if postprocess.ENTITY_NAME_REGEX.match(label):
+                    continue
+                label = normalize_label(label)
+                if label:
+                    index_dict.setdefault((language, label), set()).add(value)
+
+    records = sorted(
+        (language.encode('utf-8') + KEY_SEPARATOR + label.encode('utf-8'),
+         VALUE_SEPARATOR.join(sorted(value.encode('utf-8')
+                                     for value in value_set)))
+        for (language, label), value_set in index_dict.items()
+    )
+    header = json.dumps({
+        'nb_keys': len(records),
+        'languages': sorted({language for _, language in label_columns}),
+    }).encode('utf-8')
+
+    with open(path, 'wb') as index_file:
+        index_file.write(MAGIC)
+        index_file.write(struct.pack('<I', len(header)))
+        index_file.write(header)
+        offset = 0
+        offsets = [offset]
+        for key, value in records:
+            offset += len(key) + len(KEY_SEPARATOR) + len(value)
+            offsets.append(offset)
+        index_file.write(struct.pack('<{}Q'.format(len(offsets)), *offsets))
+        for key, value in records:
+            index_file.write(key + KEY_SEPARATOR + value)
+
+    logger.info('Label index of {} labels written in {}.'
+                .format(len(records), path))
+    return LabelIndex(path)
+
+
+class _Keys():
+    """Sequence of the keys of the index, read lazily for bisect."""
+
+    def __init__(self, label_index):
+        """Init the sequence.
+
+        Args:
+            label_index (LabelIndex): the index.
+
+        """
+        self._label_index = label_index
+
+    def __len__(self):
+        """Return the number of keys."""
+        return self._label_index.nb_keys
+
+    def __getitem__(self, position):
+        """Return the key of the record at a position."""
+        # pylint: disable=protected-access
+        return self._label_index._record(position)[0]
+
+
+class LabelIndex():
+    """LabelIndex class.
+
+    Read-only access to a label index built by build_label_index. Lookups
+    are binary searches on the memory-mapped file.
+    """
+
+    def __init__(self, path):
+        """Open a label index.
+
+        Args:
+            path (string): the path of the index file.
+
+        Raises:
+            ValueError: when the file is not a label index.
+
+        """
+        self._path = path
+        with open(path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            err_msg = f'{path} is not a label index.'
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+        header_size, = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(
+            self._mmap[header_start:header_start + header_size]
+        )
+        self._nb_keys = header['nb_keys']
+        self._languages = header['languages']
+        self._offsets_start = header_start + header_size
+        self._records_start = self._offsets_start + 8 * (self._nb_keys + 1)
+        self._keys = _Keys(self)
+
+    @property
+    def path(self):
+        """Getter of path."""
+        return self._path
+
+    @property
+    def nb_keys(self):
+        """Getter of nb_keys, the number of (language, label) in the index."""
+        return self._nb_keys
+
+    @property
+    def languages(self):
+        """Getter of languages."""
+        return self._languages
+
+    def _record(self, position):
+        """Read a record.
+
+        Args:
+            position (int): the position of the record.
+
+        Returns:
+            (bytes, bytes): the key and the values of the record.
+
+        """
+        start, end = struct.unpack_from('<QQ', self._mmap,
+                                        self._offsets_start + 8 * position)
+        record = self._mmap[self._records_start + start:
+                            self._records_start + end]
+        language, label, values = record.split(KEY_SEPARATOR, 2)
+        return language + KEY_SEPARATOR + label, values
+
+    @staticmethod
+    def _decode_values(values):
+        """Decode the values of a record."""
+        return [value.decode('utf-8')
+                for value in values.split(VALUE_SEPARATOR)]
+
+    def _query_languages(self, language):
+        """Return the languages of a lookup."""
+        if language is None:
+            return self._languages
+        return [language]
+
+    def lookup(self, label, language=None):
+        """Find the values of the property with exactly this label.
+
+        Args:
+            label (string): the label, it is normalized before the lookup.
+            language (string, optional): the language of the label. Defaults
+                to None, all the languages.
+
+        Returns:
+            list of string: the values of the property, sorted.
+
+        """
+        label = normalize_label(label).encode('utf-8')
+        values = set()
+        for current_language in self._query_languages(language):
+            key = current_language.encode('utf-8') + KEY_SEPARATOR + label
+            position = bisect.bisect_left(self._keys, key)
+            if position < self._nb_keys:
+                record_key, record_values = self._record(position)
+                if record_key == key:
+                    values.update(self._decode_values(record_values))
+        return sorted(values)
+
+    def prefix_lookup(self, prefix, language=None, max_labels=None):
+        """Find the values of the property with a label starting by prefix.
+
+        Args:
+            prefix (string): the beginning of the label, it is normalized
+                before the lookup.
+            language (string, optional): the language of the label. Defaults
+                to None, all the languages.
+            max_labels (int, optional): the maximum number of labels read per
+                language. Defaults to None, no limit.
+
+        Returns:
+            dict: the labels found, with their values of the property.
+
+        """
+        prefix = normalize_label(prefix).encode('utf-8')
+        results = {}
+        for current_language in self._query_languages(language):
+            key_prefix = current_language.encode('utf-8') + KEY_SEPARATOR
+            position = bisect.bisect_left(self._keys, key_prefix + prefix)
+            nb_labels = 0
+            while position < self._nb_keys and \
+                    (max_labels is None or nb_labels < max_labels):
+                record_key, record_values = self._record(position)
+                if not record_key.startswith(key_prefix + prefix):
+                    break
+                label = record_key[len(key_prefix):].decode('utf-8')
+                results.setdefault(label, set()).update(
+                    self._decode_values(record_values)
+                )
+                position += 1
+                nb_labels += 1
+        return {label: sorted(values) for label, values in results.items()}
+
+    def close(self):
+        """Close the index file."""
+        self._mmap.close()
+
+    def __enter__(self):
+        """Use the index as a context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the index at the end of the context."""
+        self.close()
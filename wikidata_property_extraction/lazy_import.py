@@ -0,0 +1,36 @@
+"""Lazy import of the heavy dependencies.
+
+pandas, requests and tqdm take a noticeable time to import. The modules of
+the package access them through a LazyModule, so they are only imported
+when they are used for the first time, not when the package is imported.
+"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module imported at the first access to one of its attributes."""
+
+    def __init__(self, name):
+        """Init the lazy module.
+
+        Args:
+            name (string): the name of the module, as given to import.
+
+        """
+        super().__init__(name)
+        self.__module = None
+
+    def __getattr__(self, attribute):
+        """Import the module if needed and return one of its attributes.
+
+        Args:
+            attribute (string): the name of the attribute.
+
+        Returns:
+            object: the attribute of the module.
+
+        """
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name__)
+        return getattr(self.__module, attribute)
@@ -0,0 +1,169 @@
+"""Links between ontologies, used by the second order extraction.
+
+The links can be given as a DataFrame, as a file (CSV, TSV, JSON lines,
+JSON or Parquet) or as an iterator of DataFrames. Except for a DataFrame,
+they are read chunk by chunk, so a table of links bigger than the memory can
+be used.
+"""
+import logging
+import os
+import pickle
+import tempfile
+
+from wikidata_property_extraction.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+
+logger = logging.getLogger(__name__)
+
+MANDATORY_COLUMNS = ['value_property', 'id_auxiliary', 'name_auxiliary']
+
+
+def check_columns(links_df):
+    """Check that the mandatory columns are in the links.
+
+    Args:
+        links_df (pd.DataFrame): links, or a chunk of the links.
+
+    Raises:
+        AttributeError: when a mandatory column is missing.
+
+    """
+    if not all([column in links_df.columns
+                for column in MANDATORY_COLUMNS]):
+        error_str = ('Not all mandatory columns were found in links_df:'
+                     + f'{MANDATORY_COLUMNS} are all necessary.')
+        logger.error(error_str)
+        raise AttributeError(error_str)
+
+
+def read_links_chunks(path, chunksize=100000):
+    """Read a file of links chunk by chunk.
+
+    Args:
+        path (string): the path of the file. The format is given by the
+            extension: .parquet, .jsonl, .json, .tsv, else CSV.
+        chunksize (int, optional): the number of rows of a chunk. Defaults to
+            100000.
+
+    Yields:
+        pd.DataFrame: the chunks, with all the columns as strings.
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for record_batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield record_batch.to_pandas().astype(str)
+    elif extension == '.jsonl':
+        with pd.read_json(path, lines=True, dtype=False,
+                          chunksize=chunksize) as reader:
+            for chunk_df in reader:
+                yield chunk_df.astype(str)
+    elif extension == '.json':
+        # A JSON document cannot be read by chunks
+        yield pd.read_json(path, dtype=False).astype(str)
+    else:
+        separator = '\t' if extension == '.tsv' else ','
+        with pd.read_csv(path, sep=separator, dtype=str,
+                         keep_default_na=False,
+                         chunksize=chunksize) as reader:
+            for chunk_df in reader:
+                yield chunk_df
+
+
+class LinksSource():
+    """LinksSource class.
+
+    Gives the links chunk by chunk, as many times as needed. An iterator of
+    chunks can only be read once, so its chunks are spooled in a temporary
+    file while they are read the first time.
+    """
+
+    def __init__(self, links, chunksize=100000):
+        """Init LinksSource class.
+
+        Args:
+            links (pd.DataFrame, string or iterable of pd.DataFrame): the
+                links, the path of a file of links or the chunks of the
+                links. The expected columns are ['value_property',
+                'id_auxiliary', 'name_auxiliary'].
+            chunksize (int, optional): the number of rows of a chunk when
+                reading a file. Defaults to 100000.
+
+        Raises:
+            AttributeError: when a mandatory column is missing in a
+                DataFrame.
+
+        """
+        self._links_df = None
+        self._path = None
+        self._iterator = None
+        self._spool = None
+        self._chunksize = chunksize
+        if isinstance(links, pd.DataFrame):
+            check_columns(links)
+            self._links_df = links.astype(str)
+        elif isinstance(links, (str, os.PathLike)):
+            self._path = os.fspath(links)
+        else:
+            self._iterator = iter(links)
+
+    @property
+    def links_df(self):
+        """Return all the links in a single DataFrame.
+
+        Returns:
+            pd.DataFrame: the links. Loads all the links in memory when they
+                are not already a DataFrame.
+
+        """
+        if self._links_df is not None:
+            return self._links_df
+        return pd.concat(self.chunks(), ignore_index=True)
+
+    def _spool_chunks(self):
+        """Read the iterator and write its chunks in the spool file."""
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile()
+        # Chunks already spooled by a previous iteration stopped early
+        yield from self._read_spool()
+        self._spool.seek(0, os.SEEK_END)
+        for chunk_df in self._iterator:
+            chunk_df = chunk_df.astype(str)
+            pickle.dump(chunk_df, self._spool,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            yield chunk_df
+        self._iterator = None
+
+    def _read_spool(self):
+        """Read the chunks of the spool file."""
+        if self._spool is None:
+            return
+        self._spool.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._spool)
+            except EOFError:
+                return
+
+    def chunks(self):
+        """Iterate over the chunks of the links.
+
+        Yields:
+            pd.DataFrame: a chunk of the links, with all the columns as
+                strings.
+
+        """
+        if self._links_df is not None:
+            chunks = [self._links_df]
+        elif self._path is not None:
+            chunks = read_links_chunks(self._path, self._chunksize)
+        elif self._iterator is not None:
+            chunks = self._spool_chunks()
+        else:
+            chunks = self._read_spool()
+        for chunk_df in chunks:
+            check_columns(chunk_df)
+            yield chunk_df
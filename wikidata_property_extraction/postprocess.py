@@ -1,11 +1,24 @@
 """Methods to postprocess the results obtained with the module."""
 
+import concurrent.futures
 import logging
+import os
 import re
 
-logging.basicConfig()
+from wikidata_property_extraction.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+
+# Name of the WikiData entity, used as label when there is no label in the
+# language
+ENTITY_NAME_REGEX = re.compile(r'Q[0-9]+')
+
+# Number of rows below which the aggregation stays in the current process:
+# below, pickling the partitions to the processes and back costs more than
+# the aggregation saves (see benchmarks/translations_only_processes.py)
+MIN_ROWS_PARALLEL = 200000
 
 
 def _agg_removing_duplicates(agg_elem):
@@ -25,8 +38,8 @@ def _agg_removing_duplicates(agg_elem):
     list_elem = str_elem.split('|')
 
     # Removing the name of WikiData when there is no labels in the languages
-    regex = re.compile(r'Q[0-9]+')
-    list_elem = [elem for elem in list_elem if not regex.match(elem)]
+    list_elem = [elem for elem in list_elem
+                 if not ENTITY_NAME_REGEX.match(elem)]
 
     list_elem_without_duplicates = list(set(list_elem))
     list_elem_without_duplicates.sort()
@@ -35,7 +48,72 @@ def _agg_removing_duplicates(agg_elem):
     return elem_without_duplicates
 
 
-def translations_only(results_df):
+def _aggregate_translations(results_df):
+    """Aggregate the translations of each value_property.
+
+    Args:
+        results_df (pd.DataFrame): the results, with only the column
+            value_property and the columns of the labels.
+
+    Returns:
+        pd.DataFrame: the aggregated translations, indexed by value_property.
+
+    """
+    return results_df.groupby('value_property').agg(_agg_removing_duplicates)
+
+
+def _partition_by_value_property(results_df, nb_partitions):
+    """Hash-partition the results on value_property.
+
+    All the rows of a value_property are in the same partition, so the
+    partitions can be aggregated independently.
+
+    Args:
+        results_df (pd.DataFrame): the results to partition.
+        nb_partitions (int): the number of partitions.
+
+    Returns:
+        list of pd.DataFrame: the non-empty partitions.
+
+    """
+    hash_values = pd.util.hash_pandas_object(results_df['value_property'],
+                                             index=False)
+    partition_ids = (hash_values % nb_partitions).to_numpy()
+    partitions = [results_df[partition_ids == partition_id]
+                  for partition_id in range(nb_partitions)]
+    return [partition_df for partition_df in partitions
+            if not partition_df.empty]
+
+
+def _aggregate_in_processes(results_df, nb_processes):
+    """Aggregate the translations in several processes.
+
+    Args:
+        results_df (pd.DataFrame): the results, with only the column
+            value_property and the columns of the labels.
+        nb_processes (int): the number of processes.
+
+    Returns:
+        pd.DataFrame: the aggregated translations, indexed by value_property.
+
+    """
+    partitions = _partition_by_value_property(results_df, nb_processes)
+    if len(partitions) <= 1:
+        return _aggregate_translations(results_df)
+
+    logger.info('Aggregating {} partitions in {} processes.'
+                .format(len(partitions), nb_processes))
+    # Each partition is sent once to its process, only the rows of the
+    # partition are pickled
+    with concurrent.futures.ProcessPoolExecutor(nb_processes) as executor:
+        aggregated_list = list(executor.map(_aggregate_translations,
+                                            partitions))
+
+    return pd.concat(aggregated_list).sort_index()
+
+
+def translations_only(results_df, nb_processes=1,
+                      min_rows_parallel=MIN_ROWS_PARALLEL):
     """Translations_only.
 
     Takes a DataFrame resulting of methods translate of Translator or
@@ -45,6 +123,15 @@ def translations_only(results_df):
     Args:
         results_df (pd.DataFrame): A pandas Dataframe containing the results
             of translation or second_order.
+        nb_processes (int, optional): the number of processes doing the
+            aggregation. With more than one process, the results are
+            hash-partitioned on value_property and each partition is
+            aggregated in its own process, the output is the same as with a
+            single process. At most one process per CPU is used. Defaults
+            to 1.
+        min_rows_parallel (int, optional): the number of rows below which
+            the aggregation is done in the current process whatever
+            nb_processes. Defaults to MIN_ROWS_PARALLEL.
 
     Returns:
         pd.DataFrame: A pandas DataFrame with the columns
@@ -68,7 +155,8 @@ def translations_only(results_df):
 
     results_df = results_df.drop(drop_columns, axis=1)
 
-    translations_only_df = \
-        results_df.groupby('value_property').agg(_agg_removing_duplicates)
+    nb_processes = min(nb_processes, os.cpu_count() or 1)
+    if nb_processes <= 1 or len(results_df) < min_rows_parallel:
+        return _aggregate_translations(results_df)
 
-    return translations_only_df
+    return _aggregate_in_processes(results_df, nb_processes)
@@ -0,0 +1,189 @@
+"""Progress of an extraction.
+
+Estimates the size of a job before it runs (number of pages and of bytes,
+from the number of entities) and follows it while it runs: pages done,
+bytes received, throughput and estimated time remaining. A single Progress
+can follow all the queries of a job, over the languages and the
+properties of a SecondOrder or the jobs of a batch.
+"""
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Size of the result of the query of one entity in one language, before any
+# page has been received
+BYTES_PER_ENTITY = 400
+
+Estimate = collections.namedtuple('Estimate', ['nb_entities', 'nb_pages',
+                                               'nb_bytes'])
+Estimate.__doc__ = """Size of a job: the number of entities to translate, of
+pages (queries) and of bytes of the results."""
+
+ProgressState = collections.namedtuple('ProgressState', [
+    'nb_pages_done', 'nb_pages', 'nb_bytes_done', 'nb_bytes', 'elapsed',
+    'pages_per_second', 'bytes_per_second', 'eta'
+])
+ProgressState.__doc__ = """State of a Progress, given to its callback. nb_bytes
+is the estimated total size of the results, eta the estimated number of
+seconds remaining (None before the first page)."""
+
+
+def estimate(nb_entities, nb_languages, nb_entities_per_page):
+    """Estimate the size of a job.
+
+    Args:
+        nb_entities (int): the number of entities to translate.
+        nb_languages (int): the number of languages.
+        nb_entities_per_page (int): the number of entities queried at once.
+
+    Returns:
+        Estimate: the size of the job.
+
+    """
+    nb_pages_language = -(-nb_entities // nb_entities_per_page)
+    return Estimate(nb_entities, nb_pages_language * nb_languages,
+                    nb_entities * nb_languages * BYTES_PER_ENTITY)
+
+
+def add_estimates(estimates):
+    """Sum the estimates of several jobs.
+
+    Args:
+        estimates (iterable of Estimate): the estimates.
+
+    Returns:
+        Estimate: the size of all the jobs.
+
+    """
+    total = Estimate(0, 0, 0)
+    for job_estimate in estimates:
+        total = Estimate(*(total_value + value for total_value, value
+                           in zip(total, job_estimate)))
+    return total
+
+
+def subtract_estimates(job_estimate, part_estimate):
+    """Subtract a part already counted from the estimate of a job.
+
+    Args:
+        job_estimate (Estimate): the size of the job.
+        part_estimate (Estimate): the part of the job already counted.
+
+    Returns:
+        Estimate: the size of the rest of the job, negative when the part
+            counted is larger than the job.
+
+    """
+    return Estimate(*(value - part_value for value, part_value
+                      in zip(job_estimate, part_estimate)))
+
+
+class Progress():
+    """Progress class.
+
+    Counts the pages of the job and the bytes received, shared between the
+    threads. The total grows as the translators count their entities, the
+    callback is called with a ProgressState each time it changes.
+    """
+
+    def __init__(self, callback=None, clock=time.monotonic):
+        """Init Progress class.
+
+        Args:
+            callback (callable, optional): called with a ProgressState after
+                each page and each new part of the job. Defaults to None.
+            clock (callable, optional): the clock measuring the time, in
+                seconds. Defaults to time.monotonic.
+
+        """
+        self._callback = callback
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._start_time = None
+        self._nb_pages = 0
+        self._nb_pages_done = 0
+        self._nb_bytes_estimated = 0
+        self._nb_bytes_done = 0
+
+    @property
+    def callback(self):
+        """Getter of callback."""
+        return self._callback
+
+    @callback.setter
+    def callback(self, callback):
+        """Setter function for callback.
+
+        Args:
+            callback (callable): called with a ProgressState.
+
+        """
+        self._callback = callback
+
+    def add_job(self, job_estimate):
+        """Add the pages of a part of the job to the total.
+
+        Args:
+            job_estimate (Estimate): the size of the part of the job.
+
+        """
+        with self._lock:
+            if self._start_time is None:
+                self._start_time = self._clock()
+            self._nb_pages += job_estimate.nb_pages
+            self._nb_bytes_estimated += job_estimate.nb_bytes
+        self._notify()
+
+    def add_bytes(self, nb_bytes):
+        """Count the bytes of a response.
+
+        Args:
+            nb_bytes (int): the size of the response.
+
+        """
+        with self._lock:
+            self._nb_bytes_done += nb_bytes
+
+    def page_done(self):
+        """Count a page done."""
+        with self._lock:
+            self._nb_pages_done += 1
+        self._notify()
+
+    def state(self):
+        """Return the current state.
+
+        Returns:
+            ProgressState: the state.
+
+        """
+        with self._lock:
+            now = self._clock()
+            elapsed = 0. if self._start_time is None \
+                else now - self._start_time
+            nb_pages_done = self._nb_pages_done
+            nb_pages = self._nb_pages
+            nb_bytes_done = self._nb_bytes_done
+            if nb_pages_done:
+                # Size of the pages received, rather than the first guess
+                nb_bytes = nb_bytes_done * nb_pages / nb_pages_done
+            else:
+                nb_bytes = self._nb_bytes_estimated
+        pages_per_second = None
+        bytes_per_second = None
+        eta = None
+        if nb_pages_done and elapsed > 0:
+            pages_per_second = nb_pages_done / elapsed
+            bytes_per_second = nb_bytes_done / elapsed
+            eta = (nb_pages - nb_pages_done) / pages_per_second
+        return ProgressState(nb_pages_done, nb_pages, nb_bytes_done,
+                             int(nb_bytes), elapsed, pages_per_second,
+                             bytes_per_second, eta)
+
+    def _notify(self):
+        """Call the callback with the current state."""
+        if self._callback is not None:
+            self._callback(self.state())
@@ -1,13 +1,20 @@
 """Class for second order."""
 import logging
+import pickle
+import re
+import tempfile
 
-import pandas as pd
+from wikidata_property_extraction import endpoints, links, progress, \
+    translation
+from wikidata_property_extraction.lazy_import import LazyModule
 
-from wikidata_property_extraction import translation
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+
+# The columns of labels, excluded from the deduplication keys
+LABEL_COLUMN_REGEX = re.compile(r'^(label|alt)[A-Z]')
 
 
 class SecondOrder():
@@ -23,14 +30,20 @@ class SecondOrder():
 
     def __init__(self, main_property_id, links_df, dict_properties,
                  languages_list, limit=5000, all_elem=True,
-                 nb_elems_values=100, url='https://query.wikidata.org/sparql'):
+                 nb_elems_values=100, url='https://query.wikidata.org/sparql',
+                 chunksize=100000, store=None, label_service=True,
+                 spill_dir=None, progress=None):
         """Init function of SecondOrder class.
 
         Args:
             main_property_id (int): id of the main property.
-            links_df (pd.DataFrame): DataFrame with the links between the
-                different ontologies. The expected format is columns named:
-                ['value_property', 'id_auxiliary', 'name_auxiliary']
+            links_df (pd.DataFrame, string or iterable of pd.DataFrame):
+                DataFrame with the links between the different ontologies.
+                The expected format is columns named:
+                ['value_property', 'id_auxiliary', 'name_auxiliary'].
+                It can also be the path of a CSV, TSV, JSON lines or Parquet
+                file, or an iterator of DataFrames: the links are then read
+                by chunks and only the IDs to translate are kept in memory.
             dict_properties (dict): Dictionnary of the links between the name
                 of the external ontologies and the corresponding proporties in
                 WikiData. Format: 'ontology_name': 'wikidata_id'.
@@ -47,26 +60,45 @@ class SecondOrder():
             nb_elems_values (int, optional): number of elements put in VALUES,
                 small number to avoid error 414.
             url (str, optional): url to wikidata or to a local sparql endpoint
-                of wikidata. Defaults to 'https://query.wikidata.org/sparql'.
+                of wikidata. A list of urls or an endpoints.EndpointPool
+                spreads the queries on several endpoints, with failover.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            chunksize (int, optional): the number of rows of a chunk when
+                links_df is a file. Defaults to 100000.
+            store (store.TranslationStore, optional): store of the
+                translations already obtained, shared by the translators of
+                all the properties. Defaults to None.
+            label_service (bool, optional): use the wikibase:label service
+                to get the labels, see Translator. Defaults to True.
+            spill_dir (string, optional): directory where the rows of the
+                result are written while the translations of the properties
+                are assembled, to lower the peak of memory. Defaults to
+                None, they are kept in memory.
+            progress (progress.Progress, optional): follows the pages of
+                all the properties. Defaults to None.
 
         """
-        mandatory_columns = ['value_property', 'id_auxiliary',
-                             'name_auxiliary']
-        if not all([column in links_df.columns
-                    for column in mandatory_columns]):
-            error_str = (f'Not all mandatory columns were found in links_df:'
-                         + f'{str(mandatory_columns)} are all necessary.')
-            logger.error(error_str)
-            raise AttributeError(error_str)
-        links_df = links_df.astype(str)
+        self._chunksize = chunksize
+        self._links_source = links.LinksSource(links_df, chunksize)
+        self._id_sets = None
         self._main_property_id = main_property_id
-        self._links_df = links_df
         self._dict_properties = dict_properties
         self._languages_list = languages_list
         self._limit = limit
         self._all_elem = all_elem
         self._nb_elems_values = nb_elems_values
         self._url = url
+        # Shared by all the translators, so they share the health of the
+        # endpoints
+        self._endpoint_pool = endpoints.endpoint_pool(url)
+        self._store = store
+        self._label_service = label_service
+        self._spill_dir = spill_dir
+        self._progress = progress
+        # Shared by all the translators, not to count the entities twice
+        self._nb_entities_cache = {}
+        # Estimate of each property added to the progress by translate
+        self._registered_estimates = {}
 
     @property
     def main_property_id(self):
@@ -85,21 +117,23 @@ class SecondOrder():
 
     @property
     def links_df(self):
-        """Getter of links_df."""
-        return self._links_df
+        """Getter of links_df, loads all the links when given by chunks."""
+        return self._links_source.links_df
 
     @links_df.setter
     def links_df(self, links_df):
         """Setter for links_df.
 
         Args:
-            links_df (pd.DataFrame): DataFrame with the links between the
-                different ontologies. The exected format is:
-                ['main_prop_value', 'other_prop_value', 'name_extern_ontology']
-                for each line.
+            links_df (pd.DataFrame, string or iterable of pd.DataFrame):
+                DataFrame with the links between the different ontologies,
+                the path of a file of links or an iterator of chunks. The
+                expected format is: ['value_property', 'id_auxiliary',
+                'name_auxiliary'] for each line.
 
         """
-        self._links_df = links_df
+        self._links_source = links.LinksSource(links_df, self._chunksize)
+        self._id_sets = None
 
     @property
     def dict_properties(self):
@@ -197,30 +231,105 @@ class SecondOrder():
 
         """
         self._url = url
+        self._endpoint_pool = endpoints.endpoint_pool(url)
+
+    def _get_id_sets(self):
+        """Collect the IDs of each ontology in the links, in one pass.
+
+        Returns:
+            dict: name of the ontology -> IDs in the order of the links (a
+                dict used as an ordered set), with the IDs of the main
+                property under the key None.
 
-    def __get_list_elem_prop(self, prop):
+        """
+        if self._id_sets is None:
+            id_sets = {None: {}}
+            for chunk_df in self._links_source.chunks():
+                id_sets[None].update(
+                    dict.fromkeys(chunk_df['value_property'].unique())
+                )
+                for name, group_df in chunk_df.groupby('name_auxiliary',
+                                                       sort=False):
+                    id_sets.setdefault(name, {}).update(
+                        dict.fromkeys(group_df['id_auxiliary'].unique())
+                    )
+            self._id_sets = id_sets
+        return self._id_sets
+
+    def _get_list_elem_prop(self, prop):
         """List the elements of the property in links_df.
 
         Args:
             prop (string): A WikiData property.
 
         Returns:
-            np.array: array with all the elements of prop.
+            list: all the elements of prop.
 
         """
         if prop == self._main_property_id:
-            column = 'value_property'
-            elem_list = self._links_df[column].unique()
+            elem_list = list(self._get_id_sets()[None])
         else:
-            column = 'name_auxiliary'
             prop_name = self._dict_properties[prop]
-            prop_df = self._links_df[self._links_df[column] == prop_name]
-            logger.debug(prop_df)
-            elem_list = prop_df['id_auxiliary'].unique()
+            elem_list = list(self._get_id_sets().get(prop_name, {}))
+            logger.debug(elem_list)
 
         return elem_list
 
-    def __get_translations(self, prop, is_main=False):
+    def _make_translator(self, prop):
+        """Create the translator of a property.
+
+        Args:
+            prop (string): A WikiData property.
+
+        Returns:
+            translation.Translator: the translator of the property.
+
+        """
+        translator = translation.Translator(
+            prop, self._languages_list, limit=self._limit,
+            nb_elems_values=self._nb_elems_values, url=self._endpoint_pool,
+            store=self._store, label_service=self._label_service,
+            progress=self._progress
+        )
+        return self._share_state(translator, prop)
+
+    def _share_state(self, translator, prop):
+        """Share the state of the job with the translator of a property.
+
+        Args:
+            translator (translation.Translator): the translator.
+            prop (string): the property of the translator.
+
+        Returns:
+            translation.Translator: the translator, with the counts of the
+                entities of the job and the estimate of the property
+                already added to the progress.
+
+        """
+        # pylint: disable=protected-access
+        translator._nb_entities_cache = self._nb_entities_cache
+        translator._registered_estimate = \
+            self._registered_estimates.get(prop)
+        return translator
+
+    def _get_id_list(self, prop, is_main=False):
+        """Get the list of IDs to translate for a given property.
+
+        Args:
+            prop (string): A WikiData property.
+            is_main (bool): a flag to say whether the property is the main one
+                or not.
+
+        Returns:
+            np.array: the IDs to translate, None to translate all the
+                elements of the property.
+
+        """
+        if is_main and self._all_elem:
+            return None
+        return self._get_list_elem_prop(prop)
+
+    def _get_translations(self, prop, is_main=False):
         """Get the translations of a given property.
 
         Args:
@@ -233,21 +342,70 @@ class SecondOrder():
                 the property.
 
         """
-        if is_main and self._all_elem:
-            translator = translation.Translator(
-                prop, self._languages_list, limit=self._limit,
-                nb_elems_values=self._nb_elems_values, url=self._url
-            )
-            results_df = translator.translate()
-        else:
-            elem_list = self.__get_list_elem_prop(prop)
-            translator = translation.Translator(
-                prop, self._languages_list, limit=self._limit,
-                nb_elems_values=self._nb_elems_values, url=self._url
-            )
-            results_df = translator.translate(elem_list)
+        translator = self._make_translator(prop)
+        return translator.translate(self._get_id_list(prop, is_main))
+
+    def _iter_properties(self):
+        """Iterate over the properties to translate.
+
+        Yields:
+            (string, bool): the property, and whether it is the main one.
+
+        """
+        yield self._main_property_id, True
+        for property_id in self._dict_properties:
+            yield property_id, False
+
+    def estimate(self):
+        """Estimate the size of translate before running it.
+
+        Only the count query of the main property is sent (with all_elem),
+        and its result is kept for translate.
+
+        Returns:
+            progress.Estimate: the number of entities, of pages and of bytes
+                of all the properties.
+
+        """
+        return progress.add_estimates(self._estimates().values())
+
+    def _estimates(self):
+        """Estimate the size of the translations of each property.
+
+        Returns:
+            dict: property -> progress.Estimate.
+
+        """
+        return {prop: self._make_translator(prop).estimate(
+            self._get_id_list(prop, is_main)
+        ) for prop, is_main in self._iter_properties()}
+
+    def _register_estimates(self, estimates):
+        """Add the estimates of all the properties to the progress.
+
+        The whole job is known before the first query, so the ETA covers
+        all the properties. Each translator then only adds the difference
+        with its estimate.
+
+        Args:
+            estimates (dict): property -> progress.Estimate, see _estimates.
+
+        """
+        self._registered_estimates = estimates
+        self._progress.add_job(progress.add_estimates(estimates.values()))
+
+    def _iter_property_translations(self):
+        """Get the translations of the auxiliary properties.
+
+        Yields:
+            (string, pd.DataFrame): the name of the property and its
+                translations.
 
-        return results_df
+        """
+        for property_id, property_name in self._dict_properties.items():
+            logger.info('Starting the query for the property {}'
+                        .format(property_name))
+            yield property_name, self._get_translations(property_id)
 
     def translate(self):
         """translate.
@@ -263,44 +421,225 @@ class SecondOrder():
                 id_auxiliary, name_auxiliary, source_degree]
 
         """
+        if self._progress is not None:
+            self._register_estimates(self._estimates())
+
         # First translation of the main property
 
-        main_translations_df = self.__get_translations(self._main_property_id,
-                                                       True)
+        main_translations_df = self._get_translations(self._main_property_id,
+                                                      True)
         logger.info('Translations of the main property obtained')
-        main_translations_df['source_degree'] = 'First'
-        logger.debug(main_translations_df)
-        auxiliary_translations_df = pd.DataFrame()
         # Then get the translations of the other properties
-        for property_id, property_name in self._dict_properties.items():
-            logger.info('Starting the query for the property {}'
-                        .format(property_name))
-            property_translations_df = self.__get_translations(property_id)
+        return self._assemble(main_translations_df,
+                              self._iter_property_translations())
+
+    def _assemble(self, main_translations_df, property_translations):
+        """Assemble the translations of the main and auxiliary properties.
+
+        The links are read once: each chunk is joined with the translations
+        of all the auxiliary properties. The rows are deduplicated as they
+        are joined, so only the rows of the result are kept (in memory, or
+        in a temporary file with spill_dir).
 
+        Args:
+            main_translations_df (pd.DataFrame): the translations of the main
+                property.
+            property_translations (iterable of (string, pd.DataFrame)): the
+                name and the translations of each auxiliary property.
+
+        Returns:
+            pd.DataFrame: the result of translate.
+
+        """
+        main_translations_df['source_degree'] = 'First'
+        logger.debug(main_translations_df)
+        assembly = _Assembly(self._spill_dir)
+        assembly.add(main_translations_df)
+        translations_by_name = {}
+        for property_name, property_translations_df in property_translations:
             property_translations_df = \
                 property_translations_df.rename({'value_property':
                                                  'id_auxiliary'},
                                                 axis=1)
-            links_df = self._links_df[self._links_df['name_auxiliary'] ==
-                                      property_name]
             logger.debug(property_translations_df)
-            property_translations_df = \
-                property_translations_df.merge(links_df, how='inner',
-                                               on='id_auxiliary')
-            auxiliary_translations_df = \
-                pd.concat([auxiliary_translations_df,
-                           property_translations_df],
-                          ignore_index=True, sort=True)
-
-        auxiliary_translations_df['source_degree'] = 'Second'
+            translations_by_name.setdefault(property_name, []) \
+                .append(property_translations_df)
 
         logger.info('The translations of all the properties have ' +
                     'been obtained.')
 
-        translations_df = pd.concat([main_translations_df,
-                                     auxiliary_translations_df],
-                                    ignore_index=True, sort=True)
+        # Join with the links chunk by chunk
+        for chunk_df in self._links_source.chunks():
+            for property_name, translations_list \
+                    in translations_by_name.items():
+                links_df = chunk_df[chunk_df['name_auxiliary'] ==
+                                    property_name]
+                for property_translations_df in translations_list:
+                    merged_df = \
+                        property_translations_df.merge(links_df, how='inner',
+                                                       on='id_auxiliary')
+                    merged_df['source_degree'] = 'Second'
+                    assembly.add(merged_df)
+
+        return assembly.result()
+
+
+class _Assembly():
+    """Rows of the result of SecondOrder, without duplicates.
+
+    The frames are deduplicated when they are added, with a 64 bits hash of
+    their key columns: all the columns except the labels, which only depend
+    on the entity. The index of the rows is the one they would have in the
+    concatenation of all the frames, as with pd.concat(ignore_index=True)
+    followed by drop_duplicates.
+
+    The keys are not compared: two distinct rows with the same hash are taken
+    as duplicates and the second one is lost. With n distinct rows, this
+    happens with a probability of about n^2 / 2^65, below one in a million
+    up to 6 million rows. The hashes are kept in sorted numpy arrays, 8
+    bytes per row.
+
+    With a spill file, each column of the frames is written on its own and
+    the result is built one column at a time, so the memory only holds the
+    result and the pieces of one column, not the frames and their
+    concatenation.
+    """
+
+    def __init__(self, spill_dir=None):
+        """Init the assembly.
+
+        Args:
+            spill_dir (string, optional): directory of the temporary file
+                where the frames are written. Defaults to None, the frames
+                are kept in memory.
+
+        """
+        # Sorted runs of the hashes of the rows added, merged when a run
+        # is not much bigger than the next one, so there are few runs and
+        # adding a frame does not copy all the hashes
+        self._hash_runs = []
+        self._nb_rows = 0
+        self._frames = []
+        # Index and offsets of the columns in the spill file of each frame
+        self._spilled = []
+        self._spill = None
+        if spill_dir is not None:
+            self._spill = tempfile.TemporaryFile(dir=spill_dir)
+
+    def add(self, frame_df):
+        """Add the rows of a frame which are not already in the assembly.
+
+        Args:
+            frame_df (pd.DataFrame): the frame.
+
+        """
+        frame_df = frame_df.set_axis(
+            pd.RangeIndex(self._nb_rows, self._nb_rows + len(frame_df))
+        )
+        self._nb_rows += len(frame_df)
+        frame_df = frame_df[self._new_rows(frame_df)]
+        if self._spill is None:
+            self._frames.append(frame_df)
+            return
+        offsets = {}
+        for column in frame_df.columns:
+            offsets[column] = self._spill.tell()
+            pickle.dump(frame_df[column], self._spill,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled.append((frame_df.index, offsets))
+
+    def _new_rows(self, frame_df):
+        """Flag the rows of a frame whose keys have not been added yet.
+
+        Args:
+            frame_df (pd.DataFrame): the frame.
+
+        Returns:
+            np.ndarray: True for the rows to keep.
 
-        translations_df = translations_df.drop_duplicates()
+        """
+        key_columns = sorted(column for column in frame_df.columns
+                             if not LABEL_COLUMN_REGEX.match(column))
+        hashes = pd.util.hash_pandas_object(frame_df[key_columns],
+                                            index=False).to_numpy()
+        # The first row of each hash, the hashes sorted
+        hashes, rows = np.unique(hashes, return_index=True)
+        new = ~self._seen(hashes)
+        keep = np.zeros(len(frame_df), dtype=bool)
+        keep[rows[new]] = True
+        self._add_hashes(hashes[new])
+        return keep
+
+    def _seen(self, hashes):
+        """Flag the hashes of the rows already added.
 
-        return translations_df
+        Args:
+            hashes (np.ndarray): the hashes.
+
+        Returns:
+            np.ndarray: True for the hashes already added.
+
+        """
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self._hash_runs:
+            positions = np.minimum(np.searchsorted(run, hashes),
+                                   len(run) - 1)
+            seen |= run[positions] == hashes
+        return seen
+
+    def _add_hashes(self, hashes):
+        """Add new hashes to the runs.
+
+        Args:
+            hashes (np.ndarray): the hashes, sorted, not already added.
+
+        """
+        if len(hashes) == 0:
+            return
+        self._hash_runs.append(hashes)
+        while len(self._hash_runs) > 1 \
+                and len(self._hash_runs[-2]) < 2 * len(self._hash_runs[-1]):
+            run = self._hash_runs.pop()
+            self._hash_runs[-1] = np.sort(
+                np.concatenate([self._hash_runs[-1], run]), kind='stable'
+            )
+
+    def _spilled_column(self, column):
+        """Read a column of all the spilled frames.
+
+        Args:
+            column (string): the name of the column.
+
+        Returns:
+            pd.Series: the column, as in the concatenation of the frames.
+
+        """
+        pieces = []
+        for index, offsets in self._spilled:
+            if column in offsets:
+                self._spill.seek(offsets[column])
+                pieces.append(pickle.load(self._spill).to_frame())
+            else:
+                # Missing in the frame, as in the concatenation of frames
+                pieces.append(pd.DataFrame(index=index))
+        return pd.concat(pieces, sort=True)[column]
+
+    def result(self):
+        """Concatenate the frames added.
+
+        Returns:
+            pd.DataFrame: the rows without duplicates.
+
+        """
+        if self._spill is None:
+            result_df = pd.concat(self._frames, sort=True)
+            self._frames = []
+            return result_df
+        columns = sorted(set().union(*(offsets for _, offsets
+                                       in self._spilled)))
+        result_df = pd.DataFrame({column: self._spilled_column(column)
+                                  for column in columns}, copy=False)
+        self._spilled = []
+        self._spill.close()
+        self._spill = None
+        return result_df
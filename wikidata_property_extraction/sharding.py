@@ -0,0 +1,388 @@
+"""Sharded extraction.
+
+Allows to split the extraction of one property between several worker
+processes, possibly on several machines sharing a file system. The job is
+partitioned deterministically in shards, one per query of Translator: a
+range of entities (LIMIT/OFFSET over the entities sorted by ID, or a range
+of id_list) in one language. The shards are put in a work queue, a SQLite
+file, where the workers claim them and write their results. The merge step
+assembles the results exactly as Translator.translate does.
+
+A worker can be started from the command line:
+
+    python -m wikidata_property_extraction.sharding queue.db -e URL
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+from wikidata_property_extraction import header, translation
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id INTEGER PRIMARY KEY,
+    language TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    result TEXT
+);
+'''
+
+# The parameters of the job, needed by the workers to build the queries
+METADATA_KEYS = ['property_wiki', 'languages_list', 'id_list', 'limit',
+                 'nb_elems_values', 'label_service', 'user_agent']
+
+
+class ShardQueue():
+    """ShardQueue class.
+
+    Work queue of the shards of a job, stored in a SQLite file shared by the
+    workers. A shard claimed by a worker which has not completed it after
+    lease seconds (for example a worker which has crashed) can be claimed
+    again by another worker.
+    """
+
+    def __init__(self, path, lease=600, timeout=60):
+        """Open a work queue, created if needed.
+
+        Args:
+            path (string): path of the SQLite file.
+            lease (float, optional): the number of seconds after which a
+                shard claimed but not completed can be claimed again.
+                Defaults to 600.
+            timeout (float, optional): the number of seconds to wait when
+                the file is locked by another worker. Defaults to 60.
+
+        """
+        self._path = path
+        self._lease = lease
+        # The transactions are managed explicitly, to claim the shards with
+        # a write lock
+        self._connection = sqlite3.connect(path, timeout=timeout,
+                                           isolation_level=None)
+        self._connection.executescript(SCHEMA)
+
+    @property
+    def path(self):
+        """Getter of path."""
+        return self._path
+
+    @property
+    def metadata(self):
+        """Getter of metadata, the parameters of the job."""
+        return {key: json.loads(value) for key, value
+                in self._connection.execute('SELECT key, value FROM metadata')}
+
+    def create(self, translator, id_list=None):
+        """Partition a job in shards and put them in the queue.
+
+        Counts the entities to know the number of shards. Creating again the
+        same job does nothing, so all the workers can call it.
+
+        Args:
+            translator (translation.Translator): the translator of the job,
+                its parameters are given to the workers.
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Raises:
+            ValueError: when the queue already contains another job.
+
+        Returns:
+            int: the number of shards.
+
+        """
+        if id_list is not None:
+            id_list = [str(current_id) for current_id in id_list]
+        metadata = {
+            'property_wiki': translator.property_wiki,
+            'languages_list': list(translator.languages_list),
+            'id_list': id_list,
+            'limit': translator.limit,
+            'nb_elems_values': translator.nb_elems_values,
+            'label_service': translator.label_service,
+            'user_agent': header.user_agent,
+        }
+        existing_metadata = self.metadata
+        if existing_metadata:
+            if any(existing_metadata[key] != metadata[key]
+                   for key in METADATA_KEYS if key != 'user_agent'):
+                err_msg = f'The queue {self._path} already contains another '\
+                    + 'job.'
+                logger.error(err_msg)
+                raise ValueError(err_msg)
+            return self._nb_shards()
+
+        # pylint: disable=protected-access
+        translator._id_list = id_list
+        offsets = translator._query_offsets(translator._get_nb_entities())
+        shards = [(language, offset) for language in translator.languages_list
+                  for offset in offsets]
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have created the job in the meantime
+            if not self.metadata:
+                self._connection.executemany(
+                    'INSERT INTO metadata VALUES (?, ?)',
+                    [(key, json.dumps(value))
+                     for key, value in metadata.items()]
+                )
+                self._connection.executemany(
+                    'INSERT INTO shards (language, offset) VALUES (?, ?)',
+                    shards
+                )
+            self._connection.execute('COMMIT')
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        logger.info('{} shards of {} in the queue {}.'
+                    .format(self._nb_shards(), translator.property_wiki,
+                            self._path))
+        return self._nb_shards()
+
+    def _nb_shards(self):
+        """Return the number of shards in the queue."""
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM shards'
+        ).fetchone()[0]
+
+    def make_translator(self, url='https://query.wikidata.org/sparql',
+                        session=None):
+        """Create the translator of the job of the queue.
+
+        The User-Agent of the job is used if none has been set.
+
+        Args:
+            url (str, optional): the endpoint of the worker, see Translator.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            session (requests.Session, optional): session used to send the
+                queries. Defaults to None.
+
+        Returns:
+            translation.Translator: the translator, with the id_list of the
+                job.
+
+        """
+        metadata = self.metadata
+        if header.user_agent is None and metadata['user_agent'] is not None:
+            header.initialize_user_agent(metadata['user_agent'])
+        translator = translation.Translator(
+            metadata['property_wiki'], metadata['languages_list'],
+            limit=metadata['limit'],
+            nb_elems_values=metadata['nb_elems_values'], url=url,
+            session=session, label_service=metadata['label_service']
+        )
+        # pylint: disable=protected-access
+        translator._id_list = metadata['id_list']
+        return translator
+
+    def claim(self, worker):
+        """Claim the next shard to run.
+
+        Args:
+            worker (string): the name of the worker.
+
+        Returns:
+            (int, string, int): the ID, the language and the offset of the
+                shard, None if there is no shard left to run.
+
+        """
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            shard = self._connection.execute(
+                'SELECT shard_id, language, offset FROM shards '
+                "WHERE status = 'pending' "
+                "OR (status = 'running' AND claimed_at < ?) "
+                'ORDER BY shard_id LIMIT 1', (time.time() - self._lease,)
+            ).fetchone()
+            if shard is not None:
+                self._connection.execute(
+                    "UPDATE shards SET status = 'running', worker = ?, "
+                    'claimed_at = ? WHERE shard_id = ?',
+                    (worker, time.time(), shard[0])
+                )
+            self._connection.execute('COMMIT')
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        return shard
+
+    def complete(self, shard_id, result_json):
+        """Write the result of a shard.
+
+        Args:
+            shard_id (int): the ID of the shard.
+            result_json (json): the result of the query of the shard.
+
+        """
+        self._connection.execute(
+            "UPDATE shards SET status = 'done', result = ? "
+            'WHERE shard_id = ?', (json.dumps(result_json), shard_id)
+        )
+
+    def release(self, shard_id):
+        """Put back in the queue a shard which has failed.
+
+        Args:
+            shard_id (int): the ID of the shard.
+
+        """
+        self._connection.execute(
+            "UPDATE shards SET status = 'pending', worker = NULL, "
+            "claimed_at = NULL WHERE shard_id = ? AND status = 'running'",
+            (shard_id,)
+        )
+
+    def progress(self):
+        """Count the shards per status.
+
+        Returns:
+            dict: status ('pending', 'running' or 'done') -> number of
+                shards.
+
+        """
+        progress = dict.fromkeys(['pending', 'running', 'done'], 0)
+        progress.update(self._connection.execute(
+            'SELECT status, COUNT(*) FROM shards GROUP BY status'
+        ))
+        return progress
+
+    def is_done(self):
+        """Return whether all the shards have been run."""
+        progress = self.progress()
+        return progress['pending'] == 0 and progress['running'] == 0
+
+    def merge(self):
+        """Assemble the results of the shards.
+
+        Raises:
+            ValueError: when some shards have not been run.
+
+        Returns:
+            pd.DataFrame: the same result as Translator.translate.
+
+        """
+        if not self.is_done():
+            err_msg = 'Some shards have not been run: {}.'\
+                .format(self.progress())
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+        translator = self.make_translator()
+        query_results = []
+        for language in translator.languages_list:
+            results = [result for result, in self._connection.execute(
+                'SELECT result FROM shards WHERE language = ? '
+                'ORDER BY offset', (language,)
+            )]
+            # pylint: disable=protected-access
+            query_results += [
+                (translator._parse_page(json.loads(result), language),
+                 result_index + 1 == len(results))
+                for result_index, result in enumerate(results)
+            ]
+        # pylint: disable=protected-access
+        return translator._merge_results(query_results)
+
+    def close(self):
+        """Close the queue."""
+        self._connection.close()
+
+    def __enter__(self):
+        """Use the queue as a context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the queue at the end of the context."""
+        self.close()
+
+
+def default_worker_name():
+    """Return a name identifying the current process."""
+    return '{}-{}'.format(socket.gethostname(), os.getpid())
+
+
+def run_worker(path, url='https://query.wikidata.org/sparql', worker=None,
+               lease=600):
+    """Run the shards of a queue until there is none left.
+
+    Can be the target of a multiprocessing.Process.
+
+    Args:
+        path (string): path of the queue.
+        url (str, optional): the endpoint of the worker, see Translator.
+            Defaults to 'https://query.wikidata.org/sparql'.
+        worker (string, optional): the name of the worker. Defaults to
+            None, the host name and the process ID.
+        lease (float, optional): see ShardQueue. Defaults to 600.
+
+    Returns:
+        int: the number of shards run by the worker.
+
+    """
+    worker = worker or default_worker_name()
+    nb_shards = 0
+    with ShardQueue(path, lease=lease) as queue:
+        translator = queue.make_translator(url)
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                break
+            shard_id, language, offset = shard
+            # pylint: disable=protected-access
+            query = translator._format_query(language, offset)
+            try:
+                result_json = translator._request_wikidata(query)
+            except BaseException:
+                queue.release(shard_id)
+                raise
+            queue.complete(shard_id, result_json)
+            nb_shards += 1
+    logger.info('Worker {} has run {} shards.'.format(worker, nb_shards))
+    return nb_shards
+
+
+def main(argv=None):
+    """Run a worker from the command line.
+
+    Args:
+        argv (list of string, optional): the arguments. Defaults to None, the
+            arguments of the command line.
+
+    Returns:
+        int: the exit code.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Run the shards of a queue created by ShardQueue.create.'
+    )
+    parser.add_argument('queue', help='SQLite file of the queue.')
+    parser.add_argument('-e', '--endpoint', action='append', default=None,
+                        help='url of a SPARQL endpoint, can be repeated.')
+    parser.add_argument('-n', '--name', default=None,
+                        help='name of the worker.')
+    parser.add_argument('-l', '--lease', type=float, default=600,
+                        help='seconds after which a shard claimed by '
+                        + 'another worker can be claimed again.')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    run_worker(args.queue,
+               url=args.endpoint or 'https://query.wikidata.org/sparql',
+               worker=args.name, lease=args.lease)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
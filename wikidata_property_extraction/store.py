@@ -0,0 +1,185 @@
+"""Translation store.
+
+Persistent store of the translations already obtained, shared between the
+runs and between Translator, SecondOrder and BatchTranslator. When a list
+of IDs is translated with a store, only the IDs which are not in the store
+(or whose translations are too old) are queried.
+
+The store is a SQLite database with one row per (property, value, language,
+entity). An ID without any entity is stored with an empty entity, so it is
+not queried again either.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from wikidata_property_extraction.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of variables in a SQLite query
+NB_VARIABLES_MAX = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS translations (
+    property TEXT NOT NULL,
+    value TEXT NOT NULL,
+    language TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    label TEXT,
+    alt TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (property, value, language, entity)
+)
+'''
+
+
+class TranslationStore():
+    """TranslationStore class.
+
+    SQLite store of the labels and alternative labels of the values of the
+    properties, per language.
+    """
+
+    def __init__(self, path, max_age=None):
+        """Init TranslationStore class.
+
+        Args:
+            path (string): path of the SQLite database, created if needed.
+            max_age (float, optional): the number of seconds after which a
+                translation is too old and is queried again. Defaults to
+                None, the translations are always used.
+
+        """
+        self._path = path
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(SCHEMA)
+
+    @property
+    def path(self):
+        """Getter of path."""
+        return self._path
+
+    @property
+    def max_age(self):
+        """Getter of max_age."""
+        return self._max_age
+
+    @max_age.setter
+    def max_age(self, max_age):
+        """Setter function for max_age.
+
+        Args:
+            max_age (float): the number of seconds after which a translation
+                is queried again.
+
+        """
+        self._max_age = max_age
+
+    def get(self, property_wiki, language, id_list):
+        """Get the stored translations of a list of IDs.
+
+        Args:
+            property_wiki (string): the property.
+            language (string): the language.
+            id_list (list of string): the IDs.
+
+        Returns:
+            (pd.DataFrame, list of string): the stored translations, with the
+                columns ['entity', 'value_property', 'labelLang', 'altLang'],
+                and the IDs which are not in the store or are too old, in the
+                order of id_list.
+
+        """
+        language_cap = language.capitalize()
+        id_list = list(dict.fromkeys(str(current_id)
+                                     for current_id in id_list))
+        min_fetched_at = -1. if self._max_age is None \
+            else time.time() - self._max_age
+        rows = []
+        found_ids = set()
+        with self._lock:
+            for start in range(0, len(id_list), NB_VARIABLES_MAX):
+                ids_part = id_list[start:start + NB_VARIABLES_MAX]
+                cursor = self._connection.execute(
+                    'SELECT value, entity, label, alt FROM translations '
+                    'WHERE property = ? AND language = ? AND fetched_at >= ? '
+                    'AND value IN ({})'.format(','.join('?' * len(ids_part))),
+                    [property_wiki, language, min_fetched_at] + ids_part
+                )
+                for value, entity, label, alt in cursor:
+                    found_ids.add(value)
+                    if entity:
+                        rows.append((entity, value, label, alt))
+        stored_df = pd.DataFrame(rows, columns=['entity', 'value_property',
+                                                'label' + language_cap,
+                                                'alt' + language_cap])
+        missing_ids = [current_id for current_id in id_list
+                       if current_id not in found_ids]
+        return stored_df, missing_ids
+
+    def put(self, property_wiki, language, id_list, result_df):
+        """Store the translations of a list of IDs.
+
+        Args:
+            property_wiki (string): the property.
+            language (string): the language.
+            id_list (list of string): the IDs which have been queried.
+            result_df (pd.DataFrame): the result of the query, with the
+                columns ['entity', 'value_property', 'labelLang', 'altLang'].
+
+        """
+        language_cap = language.capitalize()
+        fetched_at = time.time()
+        rows = []
+        stored_ids = set()
+        if len(result_df) > 0:
+            for entity, value, label, alt in zip(
+                    result_df['entity'], result_df['value_property'],
+                    result_df['label' + language_cap],
+                    result_df['alt' + language_cap]):
+                value = str(value)
+                stored_ids.add(value)
+                rows.append((property_wiki, value, language, entity,
+                             label, alt, fetched_at))
+        # The IDs without result are stored too, not to query them again
+        for current_id in id_list:
+            current_id = str(current_id)
+            if current_id not in stored_ids:
+                stored_ids.add(current_id)
+                rows.append((property_wiki, current_id, language, '',
+                             None, None, fetched_at))
+        stored_ids = list(stored_ids)
+        with self._lock, self._connection:
+            for start in range(0, len(stored_ids), NB_VARIABLES_MAX):
+                ids_part = stored_ids[start:start + NB_VARIABLES_MAX]
+                self._connection.execute(
+                    'DELETE FROM translations WHERE property = ? AND '
+                    'language = ? AND value IN ({})'
+                    .format(','.join('?' * len(ids_part))),
+                    [property_wiki, language] + ids_part
+                )
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO translations '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+            )
+        logger.debug('{} translations of {} in {} stored.'
+                     .format(len(rows), property_wiki, language))
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self):
+        """Use the store as a context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the store at the end of the context."""
+        self.close()
@@ -8,15 +8,21 @@ import logging
 import math
 import time
 
-import pandas as pd
-import requests
-from tqdm import tqdm
+from wikidata_property_extraction import endpoints, header, progress
+from wikidata_property_extraction.lazy_import import LazyModule
 
-from wikidata_property_extraction import header
+pd = LazyModule('pandas')
+requests = LazyModule('requests')
+tqdm = LazyModule('tqdm')
 
-logging.basicConfig()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+
+# Declared in the queries without the label service, the local endpoints do
+# not always know the prefixes of WikiData
+PREFIXES = '''
+        PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX skos: <http://www.w3.org/2004/02/skos/core#>'''
 
 
 class Translator():
@@ -30,7 +36,8 @@ class Translator():
 
     def __init__(self, property_wiki, languages_list,
                  limit=5000, nb_elems_values=200,
-                 url='https://query.wikidata.org/sparql'):
+                 url='https://query.wikidata.org/sparql', session=None,
+                 store=None, label_service=True, progress=None):
         """Init translator class.
 
         Args:
@@ -46,7 +53,25 @@ class Translator():
             nb_elems_values (int, optional): number of elements put in VALUES,
                 small number to avoid error 414.
             url (str, optional): url to wikidata or to a local sparql endpoint
-                of wikidata. Defaults to 'https://query.wikidata.org/sparql'.
+                of wikidata. A list of urls or an endpoints.EndpointPool
+                spreads the queries on several endpoints, with failover.
+                Defaults to 'https://query.wikidata.org/sparql'.
+            session (requests.Session, optional): session used to send the
+                queries, allows to share the connections between several
+                translators. Defaults to None, a new connection per query.
+            store (store.TranslationStore, optional): store of the
+                translations already obtained. translate only queries the IDs
+                of id_list which are not in the store, and stores the new
+                translations. Defaults to None.
+            label_service (bool, optional): use the wikibase:label service
+                of WikiData to get the labels. If False, the labels and
+                alternative labels are read directly with rdfs:label and
+                skos:altLabel and grouped by the client: the queries are
+                cheaper, and work with the endpoints without the service
+                (QLever, Oxigraph...). Defaults to True.
+            progress (progress.Progress, optional): follows the pages of
+                translate, can be shared with other translators to follow a
+                whole job. Defaults to None.
 
         """
         self._property_wiki = str(property_wiki)
@@ -54,6 +79,20 @@ class Translator():
         self._limit = int(limit)
         self._nb_elems_values = nb_elems_values
         self._url = url
+        self._endpoint_pool = endpoints.endpoint_pool(url)
+        self._session = session
+        self._store = store
+        self._label_service = label_service
+        self._progress = progress
+        self._id_list = None
+        # Number of entities of each count query, not to count them twice
+        self._nb_entities_cache = {}
+        # Estimate already added to the progress (by SecondOrder, before the
+        # queries of all its properties)
+        self._registered_estimate = None
+        # Rate limiter shared with other translators (by
+        # batch.BatchTranslator), paused for all of them after an error 429
+        self._rate_limiter = None
         if header.user_agent is None:
             err_msg = 'You need to set a User-Agent before using the library.'\
                 + 'Please use header.intialize_user_agent'
@@ -136,6 +175,81 @@ class Translator():
 
         """
         self._url = url
+        self._endpoint_pool = endpoints.endpoint_pool(url)
+
+    @property
+    def label_service(self):
+        """Getter of label_service."""
+        return self._label_service
+
+    @label_service.setter
+    def label_service(self, label_service):
+        """Setter function for label_service.
+
+        Args:
+            label_service (bool): use the wikibase:label service of WikiData
+                to get the labels.
+
+        """
+        self._label_service = label_service
+
+    @property
+    def progress(self):
+        """Getter of progress."""
+        return self._progress
+
+    @progress.setter
+    def progress(self, job_progress):
+        """Setter function for progress.
+
+        Args:
+            job_progress (progress.Progress): follows the pages of
+                translate.
+
+        """
+        self._progress = job_progress
+
+    def _send_query(self, query, headers):
+        """Send a query to one of the endpoints.
+
+        The endpoint is chosen in the endpoint pool. If it cannot be reached,
+        does not answer within the timeout of the pool or answers with a
+        server error, the query is sent to another endpoint, until all the
+        endpoints have been tried.
+
+        Args:
+            query (string): the SPARQL query.
+            headers (dict): the headers of the request.
+
+        Returns:
+            (requests.Response, string): the response and the url of the
+                endpoint which has sent it.
+
+        """
+        sender = requests if self._session is None else self._session
+        tried_urls = []
+        while True:
+            url = self._endpoint_pool.choose(exclude=tried_urls)
+            tried_urls.append(url)
+            last_endpoint = len(tried_urls) == len(self._endpoint_pool)
+            logger.debug((url, query))
+            try:
+                # Not streamed, the answer is read here and an endpoint
+                # stopping in the middle of it fails over too
+                result = sender.get(url,
+                                    params={'format': 'json', 'query': query},
+                                    headers=headers,
+                                    timeout=self._endpoint_pool.timeout)
+            except requests.RequestException:
+                self._endpoint_pool.report_failure(url)
+                if last_endpoint:
+                    raise
+                continue
+            if result.status_code >= 500 and not last_endpoint:
+                result.close()
+                self._endpoint_pool.report_failure(url)
+                continue
+            return result, url
 
     def _request_wikidata(self, query, retry=0):
         """Request_wikidata.
@@ -153,9 +267,30 @@ class Translator():
         Returns:
             json: the result of the query.
 
+        """
+        content = self._request_content(query, retry)
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            logger.error("The request have work but the result is not " +
+                         "a json.")
+            raise
+
+    def _request_content(self, query, retry=0):
+        """Make the request of a SPARQL query and return the raw result.
+
+        Args:
+            query (string): the SPARQL query.
+            retry (int): the number of retries of the query. Defaults to 0.
+
+        Raises:
+            AssertionError: when the request fails.
+
+        Returns:
+            bytes: the result of the query, in the SPARQL JSON format.
+
         """
         logger.debug("Query sent to WikiData SPARQL endpoint.")
-        logger.debug((self._url, query))
 
         # The user-agent is required for WikiData (rules here:
         # https://meta.wikimedia.org/wiki/User-Agent_policy)
@@ -164,59 +299,109 @@ class Translator():
             'User-Agent': header.user_agent
         }
 
-        result = requests.get(self._url,
-                              params={'format': 'json', 'query': query,
-                                      'headers': headers},
-                              stream=True)
+        result, url = self._send_query(query, headers)
+
+        if result.status_code == 200:
+            self._endpoint_pool.report_success(url)
+            content = result.content
+            if self._progress is not None:
+                self._progress.add_bytes(len(content))
+            result.close()
+            logger.debug("Results have been obtained.")
+        elif self._check_error_status(result.status_code, result.content,
+                                      retry):
+            self._wait_before_retry(self._retry_after(result))
+            content = self._request_content(query, retry+1)
+
+        return content
+
+    def _request_page(self, query):
+        """Make the request of the query of a page.
+
+        Args:
+            query (string): the SPARQL query.
+
+        Returns:
+            json: the result of the query, as given to _parse_page.
+
+        """
+        return self._request_wikidata(query)
+
+    @staticmethod
+    def _retry_after(result):
+        """Return the number of seconds to wait after an error 429.
+
+        Args:
+            result (requests.Response): the response with the error.
 
+        Returns:
+            float: the value of the header Retry-After, 60 when it is missing
+                or is a date.
+
+        """
         try:
-            if result.status_code != 200:
-                raise AssertionError
-            try:
-                result_json = result.json()
-                result.close()
-                logger.debug("Results have been obtained.")
-            except json.JSONDecodeError as error:
-                logger.error("The request have work but the result is not " +
-                             "a json.")
-                raise
-
-        except AssertionError as error:
-            if result.status_code == 429:
-                if retry <= 2:
-                    # An error 429 is a Too Many Request error, waiting before
-                    # doing a new one is a solution to solve it. But, too many
-                    # requests with this error could lead to a ban IP. So
-                    # only 2 retry.
-                    warn_msg = 'Error 429, waiting 60s before making '\
-                        + 'the request again'
-                    logger.warning(warn_msg)
-                    time.sleep(60)
-                    result_json = self._request_wikidata(query, retry+1)
-                else:
-                    err_msg = '3 straight errors 429, the IP could be ' \
-                        + 'banned to request WikiData, stop retries.'
-                    logger.error(err_msg)
-                    raise AssertionError(err_msg)
-            elif result.status_code == 403:
-                err_msg = 'Error 403, your IP seems to have been banned from'\
-                    + ' the WikiData SPARQL server. The ban is 24 hours long.'\
-                    + f' The following error message has been received: '\
-                    + f'{result.content}'
-                logger.error(err_msg)
-                raise AssertionError(err_msg)
-            elif result.status_code == 414:
-                err_msg = 'Error 414, the Request-URI is too long, reduce the'\
-                    ' value of nb_entity_request in Translator and retry.'
-                logger.error(err_msg)
-                raise AssertionError(err_msg)
-            else:
-                err_msg = f'The request has failed with error code '\
-                    + f'{result.status_code}. {result.content}'
-                logger.error(err_msg)
-                raise AssertionError(err_msg)
+            return max(float(result.headers.get('Retry-After', 60)), 0.)
+        except ValueError:
+            return 60.
 
-        return result_json
+    def _wait_before_retry(self, wait_time):
+        """Wait before sending again a query which has received an error 429.
+
+        With a rate limiter shared with other translators, they all wait, so
+        the endpoint does not receive the queries of the other workers in the
+        meantime.
+
+        Args:
+            wait_time (float): the number of seconds to wait.
+
+        """
+        logger.warning('Waiting {}s before making the request again.'
+                       .format(wait_time))
+        if self._rate_limiter is None:
+            time.sleep(wait_time)
+            return
+        self._rate_limiter.pause(wait_time)
+        self._rate_limiter.wait()
+
+    @staticmethod
+    def _check_error_status(status_code, content, retry):
+        """Handle the error status of a request.
+
+        Args:
+            status_code (int): the status code of the response.
+            content (bytes): the content of the response.
+            retry (int): the number of retries of the query.
+
+        Raises:
+            AssertionError: when the request cannot be retried.
+
+        Returns:
+            bool: True if the request must be sent again after waiting.
+
+        """
+        if status_code == 429:
+            if retry <= 2:
+                # An error 429 is a Too Many Request error, waiting before
+                # doing a new one is a solution to solve it. But, too many
+                # requests with this error could lead to a ban IP. So
+                # only 2 retry.
+                logger.warning('Error 429, too many requests.')
+                return True
+            err_msg = '3 straight errors 429, the IP could be ' \
+                + 'banned to request WikiData, stop retries.'
+        elif status_code == 403:
+            err_msg = 'Error 403, your IP seems to have been banned from'\
+                + ' the WikiData SPARQL server. The ban is 24 hours long.'\
+                + f' The following error message has been received: '\
+                + f'{content}'
+        elif status_code == 414:
+            err_msg = 'Error 414, the Request-URI is too long, reduce the'\
+                ' value of nb_entity_request in Translator and retry.'
+        else:
+            err_msg = f'The request has failed with error code '\
+                + f'{status_code}. {content}'
+        logger.error(err_msg)
+        raise AssertionError(err_msg)
 
     @staticmethod
     def __format_id_list(id_list):
@@ -276,6 +461,8 @@ class Translator():
             string: the SPARQL query.
 
         """
+        if not self._label_service:
+            return self._format_query_without_service(language, offset)
         language_cap = language.capitalize()
         query = f'''
         SELECT ?entity ?value_property ?label{language_cap}
@@ -300,6 +487,60 @@ class Translator():
         '''
         return query
 
+    def _format_query_without_service(self, language, offset=0):
+        """Format the SPARQL query of a page without the label service.
+
+        The label and each alternative label are returned in their own row,
+        they are grouped by _group_labels.
+
+        Args:
+            language (string): the language of the current query result.
+            offset (int, optional): offset of the query, useful if more
+                entities than limit. Defaults to 0.
+
+        Returns:
+            string: the SPARQL query.
+
+        """
+        language_cap = language.capitalize()
+        query = f'''{PREFIXES}
+        SELECT ?entity ?value_property ?label{language_cap} ?alt{language_cap}
+        WHERE {{
+            {{
+                SELECT ?entity ?value_property
+                WHERE {{
+                    ?entity wdt:{self._property_wiki} ?value_property .
+                    {self._format_subquery(offset)}
+            }}
+            OPTIONAL {{
+                {{
+                    ?entity rdfs:label ?label{language_cap} .
+                    FILTER (lang(?label{language_cap})='{language}')
+                }} UNION {{
+                    ?entity skos:altLabel ?alt{language_cap} .
+                    FILTER (lang(?alt{language_cap})='{language}')
+                }}
+            }}
+        }}
+        '''
+        return query
+
+    def _format_count_query(self):
+        """Format the SPARQL query counting the entities with the property.
+
+        Returns:
+            string: the SPARQL query.
+
+        """
+        prefixes = '' if self._label_service else PREFIXES
+        query = f'''{prefixes}
+        SELECT (COUNT(DISTINCT(?entity)) as ?nb_elem)
+        WHERE {{
+            ?entity wdt:{self._property_wiki} ?value_property .
+        }}
+        '''
+        return query
+
     def _get_nb_entities(self) -> int:
         """Return the number of entities to query.
 
@@ -310,12 +551,9 @@ class Translator():
         if self._id_list is not None:
             return len(self._id_list)
         else:
-            query = f'''
-            SELECT (COUNT(DISTINCT(?entity)) as ?nb_elem)
-            WHERE {{
-                ?entity wdt:{self._property_wiki} ?value_property .
-            }}
-            '''
+            query = self._format_count_query()
+            if query in self._nb_entities_cache:
+                return self._nb_entities_cache[query]
 
             logger.debug(query)
             logger.info("Querying WikiData to count the number of entities.")
@@ -325,8 +563,35 @@ class Translator():
             nb_entities = int(nb_entities_df.iloc[0, 0])
             logger.info("{} entities in the property {} have been found."
                         .format(nb_entities, self._property_wiki))
+            self._nb_entities_cache[query] = nb_entities
             return nb_entities
 
+    def _nb_entity_request(self):
+        """Return the number of entities requested in one query.
+
+        Returns:
+            int: nb_elems_values when querying a list of IDs, else limit.
+
+        """
+        if self._id_list is not None:
+            return self._nb_elems_values
+        return self._limit
+
+    def _query_offsets(self, nb_entities):
+        """List the offsets of the queries needed for one language.
+
+        Args:
+            nb_entities (int): the number of entities to query.
+
+        Returns:
+            list of int: the offset of each query.
+
+        """
+        nb_entity_request = self._nb_entity_request()
+        nb_queries = math.ceil(nb_entities/nb_entity_request)
+        return [query_iter * nb_entity_request
+                for query_iter in range(nb_queries)]
+
     def _query_generator(self):
         """Query_generator.
 
@@ -338,30 +603,77 @@ class Translator():
 
         """
         nb_entities = self._get_nb_entities()
-        if self._id_list is not None:
-            nb_entity_request = self._nb_elems_values
-        else:
-            nb_entity_request = self._limit
+        offsets = self._query_offsets(nb_entities)
+        job_estimate = self._estimate(nb_entities)
+        self._register_job(job_estimate)
+
+        logger.info('Starting the {} queries.'.format(job_estimate.nb_pages))
+        with tqdm.tqdm(total=job_estimate.nb_pages) as progress_bar:
+            # First loop on the different languages
+            for language in self._languages_list:
+                logger.info('Starting queries for lang {}'.format(language))
+
+                # Loop to ensure the limitation of entities number in one
+                # query
+                for query_iter, offset in enumerate(offsets):
+                    query = self._format_query(language, offset)
+                    result_query = self._request_page(query)
+                    result_offset_df = self._parse_page(result_query,
+                                                        language)
+                    progress_bar.update()
+                    if self._progress is not None:
+                        self._progress.page_done()
+                    flag_lang = query_iter + 1 == len(offsets)
+                    yield result_offset_df, flag_lang
+
+    def _register_job(self, job_estimate):
+        """Add the pages of the queries to the progress.
+
+        When an estimate has already been registered, only the difference is
+        added, for example for the IDs found in the store.
 
-        nb_queries = math.ceil(nb_entities/nb_entity_request) \
-            * len(self._languages_list)
+        Args:
+            job_estimate (progress.Estimate): the size of the queries.
 
-        logger.info('Starting the {} queries.'.format(nb_queries))
-        # First loop on the different languages
-        for language in self._languages_list:
-            logger.info('Starting queries for lang {}'.format(language))
-            result_lang_df = pd.DataFrame()
-
-            nb_queries = math.ceil(nb_entities/nb_entity_request)
-            # Loop to ensure the limitation of entities number in one query
-            for query_iter in tqdm(range(nb_queries)):
-                query = self._format_query(language,
-                                           query_iter * nb_entity_request)
-                result_query = self._request_wikidata(query)
-                result_offset_df = \
-                    self._json_to_pandas(result_query)
-                flag_lang = query_iter + 1 == nb_queries
-                yield result_offset_df, flag_lang
+        """
+        if self._progress is None:
+            return
+        if self._registered_estimate is not None:
+            job_estimate = progress.subtract_estimates(
+                job_estimate, self._registered_estimate
+            )
+            self._registered_estimate = None
+        self._progress.add_job(job_estimate)
+
+    def _estimate(self, nb_entities):
+        """Estimate the size of the queries of nb_entities entities.
+
+        Args:
+            nb_entities (int): the number of entities to query.
+
+        Returns:
+            progress.Estimate: the number of pages and of bytes.
+
+        """
+        return progress.estimate(nb_entities, len(self._languages_list),
+                                 self._nb_entity_request())
+
+    def estimate(self, id_list=None):
+        """Estimate the size of translate before running it.
+
+        Only the count query is sent, and its result is kept for translate.
+
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
+        Returns:
+            progress.Estimate: the number of entities, of pages and of bytes
+                of the results.
+
+        """
+        self._id_list = id_list
+        return self._estimate(self._get_nb_entities())
 
     def _get_value(self, dict_data):
         """Extract the value of the dictionaries given by a request.
@@ -396,6 +708,58 @@ class Translator():
         logger.debug("Parsing of the query successful.")
         return pd.DataFrame(json_text)
 
+    def _parse_page(self, json_text, language):
+        """Transform the result of the query of a page into a DataFrame.
+
+        Args:
+            json_text (json): the result of the query of _format_query.
+            language (string): the language of the query.
+
+        Returns:
+            pd.DataFrame: one row per entity, with its label and alternative
+                labels.
+
+        """
+        page_df = self._json_to_pandas(json_text)
+        if self._label_service:
+            return page_df
+        return self._group_labels(page_df, language)
+
+    @staticmethod
+    def _group_labels(page_df, language):
+        """Group the labels of the rows of a query without label service.
+
+        Gives the same result as the label service: the label is the ID of
+        the entity when it has no label in the language, and the alternative
+        labels are separated by '|'.
+
+        Args:
+            page_df (pd.DataFrame): a row per label or alternative label.
+            language (string): the language of the query.
+
+        Returns:
+            pd.DataFrame: a row per entity.
+
+        """
+        if len(page_df) == 0:
+            return page_df
+        language_cap = language.capitalize()
+        label_column = 'label' + language_cap
+        alt_column = 'alt' + language_cap
+        keys = ['entity', 'value_property']
+        page_df = page_df.reindex(columns=keys + [label_column, alt_column])
+        labels = page_df.groupby(keys, sort=False)[label_column].first()
+        alts = page_df.dropna(subset=[alt_column]) \
+            .groupby(keys, sort=False)[alt_column].agg('|'.join)
+        grouped_df = labels.to_frame().join(alts).reset_index()
+        # Same fallback as the label service
+        entity_ids = grouped_df['entity'].str.rsplit('/', n=1).str[-1]
+        grouped_df[label_column] = grouped_df[label_column] \
+            .fillna(entity_ids)
+        grouped_df[alt_column] = grouped_df[alt_column].fillna('')
+        # The joined alternative labels have the dtype of the parsed strings
+        return grouped_df.infer_objects()
+
     def translate(self, id_list=None):
         """translate.
 
@@ -403,6 +767,10 @@ class Translator():
         alternative labels and value of a specific property of the requested
         entities.
 
+        Args:
+            id_list (list of string, optional): the IDs to translate.
+                Defaults to None, all the entities with the property.
+
         Returns:
             pd.DataFrame: containing all the labels and alternative
                 labels of the entities with the given property in the
@@ -410,12 +778,115 @@ class Translator():
                 ('labelLang', 'altLang') with Lang in languages_list]
 
         """
-        self._id_list = id_list
+        if self._store is None:
+            self._id_list = id_list
+            return self._merge_results(self._query_generator())
+
+        if id_list is None:
+            self._id_list = None
+            result_df = self._merge_results(self._query_generator())
+            self._put_in_store(result_df, None)
+            return result_df
+
+        stored_df, missing_ids = self._get_from_store(id_list)
+        self._id_list = missing_ids
+        result_df = self._merge_results(self._query_generator())
+        self._put_in_store(result_df, missing_ids)
+        return self._combine_with_stored(stored_df, result_df)
+
+    def _get_from_store(self, id_list):
+        """Get the translations of a list of IDs which are in the store.
+
+        Args:
+            id_list (list of string): the IDs to translate.
+
+        Returns:
+            (pd.DataFrame, list of string): the stored translations of the IDs
+                stored in all the languages, and the IDs to query.
 
-        result_df = pd.DataFrame(columns=['entity', 'value_property'])
+        """
+        query_results = []
+        missing_ids = set()
+        for language in self._languages_list:
+            stored_df, language_missing_ids = \
+                self._store.get(self._property_wiki, language, id_list)
+            missing_ids.update(language_missing_ids)
+            query_results.append((stored_df, True))
+        # An ID missing in one language is queried in all the languages
+        missing_ids = [current_id for current_id
+                       in dict.fromkeys(str(current_id)
+                                        for current_id in id_list)
+                       if current_id in missing_ids]
+        query_results = [
+            (stored_df[~stored_df['value_property'].isin(missing_ids)], flag)
+            for stored_df, flag in query_results
+        ]
+        logger.info('{} IDs of {} to query, the others are in the store.'
+                    .format(len(missing_ids), self._property_wiki))
+        return self._merge_results(query_results), missing_ids
+
+    def _put_in_store(self, result_df, id_list):
+        """Put the result of the queries in the store.
+
+        Args:
+            result_df (pd.DataFrame): the result of the queries.
+            id_list (list of string): the IDs queried, None if all the
+                entities with the property have been queried.
+
+        """
+        if id_list is None:
+            id_list = result_df['value_property'].unique()
+        for language in self._languages_list:
+            language_cap = language.capitalize()
+            columns = ['entity', 'value_property', 'label' + language_cap,
+                       'alt' + language_cap]
+            if not all(column in result_df.columns for column in columns):
+                language_df = pd.DataFrame(columns=columns)
+            else:
+                language_df = result_df[columns].dropna(subset=[columns[2]])
+            self._store.put(self._property_wiki, language, id_list,
+                            language_df)
+
+    @staticmethod
+    def _combine_with_stored(stored_df, result_df):
+        """Combine the stored translations with the result of the queries.
+
+        Args:
+            stored_df (pd.DataFrame): the translations from the store.
+            result_df (pd.DataFrame): the result of the queries of the other
+                IDs.
+
+        Returns:
+            pd.DataFrame: the translations of all the IDs, in the order of
+                translate.
+
+        """
+        if len(stored_df) == 0:
+            return result_df
+        if len(result_df) == 0:
+            return stored_df
+        # The languages are merged with an outer merge, which sorts the rows
+        combined_df = pd.concat([stored_df, result_df], ignore_index=True)
+        combined_df = combined_df.sort_values(['entity', 'value_property'])
+        return combined_df.reset_index(drop=True)
+
+    @staticmethod
+    def _merge_results(query_results):
+        """Merge the results of the queries into a single DataFrame.
+
+        Args:
+            query_results (iterable of (pd.DataFrame, bool)): the result of
+                each query, in the order of _query_generator, with the flag
+                indicating if it is the last query of its language.
+
+        Returns:
+            pd.DataFrame: the results of all the languages merged on
+                ['entity', 'value_property'].
+
+        """
         result_lang_df = pd.DataFrame(columns=['entity', 'value_property'])
         full_result_df = pd.DataFrame(columns=['entity', 'value_property'])
-        for query_df, flag_lang in self._query_generator():
+        for query_df, flag_lang in query_results:
             result_lang_df = pd.concat([result_lang_df, query_df], axis=0,
                                        join='outer', ignore_index=True,
                                        sort=True)